@@ -0,0 +1,218 @@
+"""
+搜索引擎的基准测试
+在固定的随机种子和局面下测试 MCTS.search, MCTS.simulate, BoardState 复制, UnionFind 操作, BFS 寻路和胜负判断的速度,
+结果以 JSON 格式输出, 可以与保存的基准结果对比, 任意指标下降超过阈值时返回非 0 退出码
+
+    python -m benchmarks.suite --output result.json
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --threshold 0.15
+"""
+import json
+import platform
+import random
+import sys
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import Callable, Dict
+
+from hexcore.Algorithms import MCTS, BFS, BoardState, UnionFind, RedTeam, NoneTeam, State, board_class
+
+SIZES = [5, 7, 9, 11, 13, 15, 17, 19]
+
+
+def make_position(size: int, seed: int, fill: float) -> BoardState:
+    """使用固定的随机种子生成一个局面, 双方轮流落子占满 fill 比例的棋盘, 且还没有分出胜负"""
+    rand = random.Random(seed)
+    state = BoardState([[NoneTeam] * size for _ in range(size)], RedTeam)
+    moves = list(range(size * size))
+    rand.shuffle(moves)
+    for move in moves[:int(size * size * fill)]:
+        backup = state.copy()
+        state.play(move)
+        if state.get_winner() != NoneTeam:
+            return backup
+    return state
+
+
+def to_state(board_state: BoardState) -> State:
+    """一维棋盘转换为二维数组"""
+    size = board_state.size
+    return [list(board_state.cells[row * size:(row + 1) * size]) for row in range(size)]
+
+
+def measure(func: Callable[[], int], duration: float) -> float:
+    """在 duration 秒内重复执行 func, func 返回本次完成的操作数, 返回每秒操作数"""
+    count = 0
+    start = perf_counter()
+    while perf_counter() - start < duration:
+        count += func()
+    return count / (perf_counter() - start)
+
+
+def bench_search(size: int, args) -> Dict[str, float]:
+    """MCTS.search 每秒模拟次数和展开结点数"""
+    random.seed(args.seed)
+    position = make_position(size, args.seed, 0.1)
+    mcts = MCTS(to_state(position), position.turn, args.playout, board=args.board)
+    mcts.search(args.duration)
+    statistics = mcts.statistics
+    return {"simulations_per_second": statistics.simulate_times / statistics.run_time,
+            "nodes_per_second": statistics.node_count / statistics.run_time}
+
+
+def bench_simulate(size: int, args) -> Dict[str, float]:
+    """每种模拟方式每秒的模拟次数"""
+    random.seed(args.seed)
+    position = make_position(size, args.seed, 0.1)
+    start = board_class(args.board)(to_state(position), position.turn)
+    results = {}
+    for playout in ("random", "fill", "bridge"):
+        simulate = MCTS(to_state(position), position.turn, playout, board=args.board).simulate
+
+        def run():
+            simulate(start.copy())
+            return 1
+
+        results[f"{playout}_playouts_per_second"] = measure(run, args.duration)
+    return results
+
+
+def bench_copy(size: int, args) -> Dict[str, float]:
+    """BoardState 每秒复制次数"""
+    position = make_position(size, args.seed, 0.3)
+    position = board_class(args.board)(to_state(position), position.turn)
+
+    def run():
+        for _ in range(100):
+            position.copy()
+        return 100
+
+    return {"copies_per_second": measure(run, args.duration)}
+
+
+def bench_union_find(size: int, args) -> Dict[str, float]:
+    """UnionFind 每秒 union + find 的操作次数"""
+    rand = random.Random(args.seed)
+    count = size * size
+    pairs = [(rand.randrange(count), rand.randrange(count)) for _ in range(count)]
+
+    def run():
+        uf = UnionFind(size)
+        for x, y in pairs:
+            uf.union(x, y)
+        for x, y in pairs:
+            uf.connected(x, y)
+        return 3 * len(pairs)
+
+    return {"operations_per_second": measure(run, args.duration)}
+
+
+def bench_bfs(size: int, args) -> Dict[str, float]:
+    """BFS 在下满的棋盘上每秒寻找红方和蓝方路径的次数"""
+    position = make_position(size, args.seed, 0.1)
+    MCTS.fill_playout(position)  # 使用固定种子填满棋盘
+    bfs = BFS(to_state(position))
+    results = {}
+    for name, find_path in (("red", bfs.find_red_path), ("blue", bfs.find_blue_path)):
+        def run():
+            find_path()
+            return 1
+
+        results[f"find_{name}_path_per_second"] = measure(run, args.duration)
+    return results
+
+
+def bench_winner(size: int, args) -> Dict[str, float]:
+    """在下满的棋盘上每秒判断胜负的次数"""
+    position = make_position(size, args.seed, 0.1)
+    MCTS.fill_playout(position)  # 使用固定种子填满棋盘
+    position = board_class(args.board)(to_state(position), position.turn)
+
+    def run():
+        for _ in range(10):
+            position.get_full_board_winner()
+        return 10
+
+    return {"full_board_winner_per_second": measure(run, args.duration)}
+
+
+BENCHMARKS = {
+    "search": bench_search,
+    "simulate": bench_simulate,
+    "board_copy": bench_copy,
+    "union_find": bench_union_find,
+    "bfs": bench_bfs,
+    "winner": bench_winner,
+}
+
+
+def run_suite(args) -> dict:
+    """运行全部测试, 返回结果字典"""
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if args.only and name not in args.only:
+            continue
+        for size in args.sizes:
+            random.seed(args.seed)
+            key = f"{name}/{size}"
+            results[key] = bench(size, args)
+            print(f"{key:>16}: " + ", ".join(f"{k}={v:.0f}" for k, v in results[key].items()), file=sys.stderr)
+    return {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(), "seed": args.seed,
+                 "duration": args.duration, "playout": args.playout, "board": args.board},
+        "results": results,
+    }
+
+
+def compare(result: dict, baseline: dict, threshold: float) -> list:
+    """
+    与基准结果对比, 所有指标都是越大越好
+    :return: 下降超过阈值的指标列表 [(key, metric, baseline, current)]
+    """
+    regressions = []
+    for key, metrics in baseline["results"].items():
+        for metric, base_value in metrics.items():
+            value = result["results"].get(key, {}).get(metric)
+            if value is not None and value < base_value * (1 - threshold):
+                regressions.append((key, metric, base_value, value))
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description="hex engine benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="棋盘大小")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="只运行指定的测试")
+    parser.add_argument("--duration", type=float, default=0.5, help="每项测试的运行时间/秒")
+    parser.add_argument("--seed", type=int, default=20201227, help="随机种子")
+    parser.add_argument("--playout", default="fill", help="MCTS.search 使用的模拟方式")
+    parser.add_argument("--board", default="array", choices=["array", "bitboard"], help="棋盘状态的实现")
+    parser.add_argument("--output", help="结果输出文件, 默认输出到标准输出")
+    parser.add_argument("--baseline", help="用于对比的基准结果文件")
+    parser.add_argument("--threshold", type=float, default=0.1, help="允许的性能下降比例")
+    parser.add_argument("--save-baseline", help="把本次结果保存为基准结果")
+    args = parser.parse_args()
+
+    result = run_suite(args)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    elif not args.save_baseline:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.threshold)
+        for key, metric, base_value, value in regressions:
+            print(f"[regression] {key} {metric}: {base_value:.0f} -> {value:.0f} ({value / base_value - 1:+.1%})",
+                  file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"no regression beyond {args.threshold:.0%}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+树并行 MCTS 与单进程 MCTS 的对比测试
+在相同的时间内比较每秒展开的结点数、每秒模拟次数, 并让两者对弈若干局比较棋力
+
+    python -m benchmarks.tree_parallel --size 9 --time 1 --workers 4 --games 10
+"""
+from argparse import ArgumentParser
+
+from hexcore.Algorithms import MCTS, BoardState, RedTeam, NoneTeam
+from hexcore.Parallel import TreeParallelMCTS, prepare_pool
+
+
+def to_state(board_state: BoardState):
+    """一维棋盘转换为 MCTS 使用的二维数组"""
+    size = board_state.size
+    return [list(board_state.cells[row * size:(row + 1) * size]) for row in range(size)]
+
+
+def create_engine(name: str, board_state: BoardState, args):
+    """按名字创建搜索引擎"""
+    if name == "tree":
+        return TreeParallelMCTS(to_state(board_state), board_state.turn, args.workers, args.playout)
+    return MCTS(to_state(board_state), board_state.turn, args.playout)
+
+
+def measure_speed(name: str, args):
+    """空棋盘上搜索一次, 返回每秒结点数和每秒模拟次数"""
+    board_state = BoardState([[NoneTeam] * args.size for _ in range(args.size)], RedTeam)
+    engine = create_engine(name, board_state, args)
+    engine.search(args.time)
+    statistics = engine.statistics
+    return statistics.node_count / statistics.run_time, statistics.simulate_times / statistics.run_time
+
+
+def play_game(red: str, blue: str, args) -> int:
+    """两个引擎对弈一局, 返回获胜方"""
+    board_state = BoardState([[NoneTeam] * args.size for _ in range(args.size)], RedTeam)
+    while board_state.get_winner() == NoneTeam:
+        engine = create_engine(red if board_state.turn == RedTeam else blue, board_state, args)
+        engine.search(args.time)
+        board_state.set_piece(engine.best_move())
+    return board_state.get_winner()
+
+
+def main():
+    parser = ArgumentParser(description="tree-parallel MCTS benchmark")
+    parser.add_argument("--size", type=int, default=9, help="棋盘大小")
+    parser.add_argument("--time", type=float, default=1, help="每一步的搜索时间/秒")
+    parser.add_argument("--workers", type=int, default=4, help="树并行的进程数量")
+    parser.add_argument("--games", type=int, default=10, help="对弈局数, 双方轮流执红先手")
+    parser.add_argument("--playout", default="fill", help="模拟方式")
+    args = parser.parse_args()
+
+    prepare_pool(args.workers, "tree")  # 进程池启动的时间会计入第一次搜索, 测速之前先启动
+    for name in ("single", "tree"):
+        nodes_per_second, simulations_per_second = measure_speed(name, args)
+        print(f"{name:>6}: {nodes_per_second:10.0f} nodes/s {simulations_per_second:10.0f} simulations/s")
+
+    tree_wins = 0
+    for game in range(args.games):
+        red, blue = ("tree", "single") if game % 2 == 0 else ("single", "tree")
+        winner = play_game(red, blue, args)
+        winner_name = red if winner == RedTeam else blue
+        tree_wins += winner_name == "tree"
+        print(f"game {game + 1}: red={red} blue={blue} winner={winner_name}")
+    print(f"tree-parallel won {tree_wins}/{args.games} games against single-process MCTS")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ from os import path
 
 from pygame import image, transform, Color
 
+from hexcore.Board import Team
+
 
 class Colors:
     """一些颜色常量"""
@@ -30,3 +32,17 @@ class Assets:
     # 处理过后
     surf_start = transform.smoothscale(img_start, [220, 200])
     surf_game_win = transform.smoothscale(img_game_win, [200, 200])
+
+
+class Utils:
+    """工具类"""
+
+    @staticmethod
+    def get_team_color(team: Team):
+        """获取队伍对应的颜色"""
+        if team == Team.RED:
+            return Colors.RED
+        elif team == Team.BLUE:
+            return Colors.BLUE
+        else:
+            return Colors.WHITE
@@ -0,0 +1,121 @@
+import math
+from typing import Dict, List, Iterable, Optional, Set, Tuple
+
+import pygame
+from pygame import Color
+from pygame.rect import Rect
+
+from gameui.Assets import Colors, Utils
+from gameui.Config import Config
+from gameui.Hexagon import Hexagon
+from hexcore.Board import Board, Team
+
+Pos = Tuple[int, int]
+
+
+class BoardRenderer:
+    """
+    带缓存的棋盘渲染器
+    六边形的几何信息每种棋盘大小只计算一次, 边界和空棋盘预先画在背景 Surface 上,
+    每一帧只重画颜色发生变化的六边形, 返回需要更新的矩形区域, 交给 pygame.display.update
+    """
+
+    def __init__(self, screen: pygame.Surface, width: int, height: int, board_size: int):
+        self.screen = screen
+        self.size = board_size
+        # 六边形对象只创建一次, 顶点坐标和包围矩形都在创建时算好
+        self.hexagons = [[Hexagon(screen, row, col) for col in range(board_size)] for row in range(board_size)]
+        self.background = self.render_background(width, height)  # 边界和空棋盘
+        self.scratch = self.background.copy()  # 局部重画使用的草稿, 只读取刚刚重画过的矩形区域
+        # 与每个六边形外接矩形相交的六边形, 按行优先排列, 局部重画时与整屏绘制的覆盖顺序相同
+        self.overlaps: Dict[Pos, List[Hexagon]] = {
+            hexagon.get_row_col(): [other for other in self.items()
+                                    if abs(other.row - hexagon.row) <= 1 and abs(other.col - hexagon.col) <= 2
+                                    and other.bounds.colliderect(hexagon.bounds)]
+            for hexagon in self.items()
+        }
+        self.colors: Dict[Pos, Color] = {}  # 屏幕上每个六边形当前的颜色
+        self.board: Board = None  # 上一次绘制的棋盘
+        self.drawn_moves = 0  # 上一次绘制时棋盘上的落子数量
+        self.special: Set[Pos] = set()  # 上一次绘制时悬浮或高亮的位置
+        self.full_redraw = True  # 下一帧是否需要整屏重画
+
+    def render_background(self, width: int, height: int) -> pygame.Surface:
+        """预先画好棋盘上下左右的边界和全部空白六边形"""
+        surface = pygame.Surface((width, height))
+        surface.fill(Colors.WHITE)
+        n = self.size  # 棋盘一行的六边形数量
+        d = Config.hexagon_length  # 六边形边长
+        rect_width = (2 * n - 1) * d * math.cos(math.pi / 6)  # 上下矩形的宽度
+        rect_height = d * math.sin(math.pi / 6)  # 上下矩形的高度
+        bt_rect_start_x = n * d * math.cos(math.pi / 6)  # 底部矩形的起点 x 坐标
+        bt_rect_start_y = height - rect_height  # 底部矩形的起点 y 坐标
+        # 左右先画, 防止覆盖上下矩形部分区域
+        pygame.draw.rect(surface, Colors.BLUE, [0, rect_height, bt_rect_start_x, height])  # 左侧矩形
+        pygame.draw.rect(surface, Colors.BLUE, [rect_width, 0, width, height])  # 右侧背景
+        pygame.draw.rect(surface, Colors.RED, [0, 0, rect_width, rect_height])  # 上方矩形
+        pygame.draw.rect(surface, Colors.RED, [bt_rect_start_x, bt_rect_start_y, width, height])  # 下方矩形
+        for hexagon in self.items():
+            hexagon.draw(Colors.WHITE, surface=surface)
+        return surface
+
+    def items(self) -> Iterable[Hexagon]:
+        """遍历全部六边形"""
+        for row in self.hexagons:
+            yield from row
+
+    def invalidate(self):
+        """下一帧整屏重画, 用于切换界面之后"""
+        self.full_redraw = True
+
+    def draw_cell(self, pos: Pos, color: Color, dirty: List[Rect]):
+        """
+        六边形颜色变化时重画, 并记录需要更新的区域
+        多边形填充会有少量像素越过边框, 所以在草稿上恢复外接矩形内的背景, 按整屏绘制的顺序重画所有相交的六边形,
+        再把外接矩形复制到屏幕上, 结果与整屏重画完全相同 (直接在屏幕上设置裁剪区域会改变多边形的光栅化结果)
+        """
+        if self.colors.get(pos) == color:
+            return
+        self.colors[pos] = color
+        bounds = self.hexagons[pos[0]][pos[1]].bounds
+        self.scratch.blit(self.background, bounds, bounds)
+        for hexagon in self.overlaps[pos]:
+            hexagon.draw(self.colors[hexagon.get_row_col()], surface=self.scratch)
+        self.screen.blit(self.scratch, bounds, bounds)
+        dirty.append(bounds)
+
+    def draw(self, board: Board, hover: Optional[Pos] = None, hover_color: Color = None,
+             highlight: Iterable[Pos] = ()) -> List[Rect]:
+        """
+        按棋盘数据绘制
+        只检查上一次绘制之后新增的落子、鼠标悬浮位置的变化和高亮的路径, 不遍历整个棋盘
+        :param board: 棋盘
+        :param hover: 鼠标悬浮的位置, 没有棋子时显示为 hover_color
+        :param highlight: 需要高亮的位置, 如获胜者的路径
+        :return: 需要更新的屏幕区域
+        """
+        dirty: List[Rect] = []
+        if self.full_redraw or board is not self.board or len(board.moves) < self.drawn_moves:
+            # 整屏重画: 恢复背景, 然后画出全部棋子
+            self.screen.blit(self.background, (0, 0))
+            self.colors = {hexagon.get_row_col(): Colors.WHITE for hexagon in self.items()}
+            self.board, self.drawn_moves, self.special, self.full_redraw = board, 0, set(), False
+            dirty.append(self.screen.get_rect())
+
+        moves = board.moves
+        for piece in moves[self.drawn_moves:]:
+            self.draw_cell((piece.row, piece.col), Utils.get_team_color(piece.team), dirty)
+        self.drawn_moves = len(moves)
+
+        # 上一帧悬浮或高亮过的位置恢复为棋子的颜色
+        highlight = set(highlight)
+        special = set(highlight)
+        if hover is not None and board[hover[0]][hover[1]].team == Team.NONE:
+            special.add(hover)
+        for row, col in self.special - special:
+            self.draw_cell((row, col), Utils.get_team_color(board[row][col].team), dirty)
+        for pos in special:
+            self.draw_cell(pos, Colors.YELLOW if pos in highlight else hover_color, dirty)
+        self.special = special
+        return dirty
+
@@ -12,4 +12,21 @@ class Config:
     board_size = 10  # 棋盘大小 NxN
     game_mode = 2  # 1 双人模式, 2 人机模式, 3 机器对抗
     first_player = 0  # 先手, 0 红方, 1蓝方
+    judge_board = "array"  # 裁判使用的棋盘状态, array 一维数组加并查集, bitboard 位棋盘
     ai_level = 2  # 蒙特卡洛搜索时间上限/秒
+    ai_time_budget = 0  # 一局棋的总思考时间/秒, 按剩余空白位置为每一步分配时间, 0 为每一步固定搜索 ai_level 秒
+    ai_early_stop = True  # 最佳落子已经不可能改变时提前结束搜索, 时间用完时最佳落子不稳定则适当延长
+    ai_workers = 1  # 并行搜索的进程数量, 1 为单进程搜索
+    ai_parallel = "root"  # 并行搜索方式, root 每个进程一棵独立的树, tree 所有进程共享一棵树 (不支持 ai_rave_k 和 ai_tt_size)
+    ai_playout = "fill"  # 蒙特卡洛模拟方式, random 逐步随机落子, fill 一次性填满棋盘再判断胜负, bridge 填满时保桥和边模板, numpy 批量模拟
+    ai_batch_size = 256  # numpy 模拟方式下每个叶子结点模拟的局数
+    ai_board = "array"  # 搜索使用的棋盘状态, array 一维数组加并查集, bitboard 位棋盘
+    ai_rave_k = 0  # RAVE 的等价参数, 结点访问次数远大于它时只使用 uct, 0 为不使用 RAVE
+    ai_tt_size = 0  # 置换表最多保存的局面数量, 0 为不使用置换表
+    ai_prune = True  # 展开结点时剪掉死子、被吃的位置和被支配的落子, 减少子节点数量
+    ai_solver_empty = 20  # 空白位置不超过这个数量时先用证明数搜索求解残局, 解出必胜时直接落子, 0 为不使用
+    ai_solver_time = 1  # 每一步求解残局的时间上限/秒, 不超过本步搜索时间的一半, 没有解出时用剩下的时间进行蒙特卡洛搜索
+    ai_profile = False  # 是否记录并输出每一步搜索各阶段的耗时
+    ai_ponder = True  # 是否在对手思考时后台继续搜索, 只用于单进程搜索, 机器对抗时两个 AI 都不会后台思考
+    ai_opening_book = True  # 是否使用开局库, 棋盘大小对应的开局库文件不存在时自动跳过
+    ai_book_dir = None  # 开局库目录, None 为 hexcore/books
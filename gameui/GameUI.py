@@ -1,29 +1,17 @@
 import math
-from threading import Thread
+from concurrent.futures import Future
 
 import pygame
 from pygame import sysfont, Color
 
-from gameui.Assets import Assets, Colors
+from gameui.Assets import Assets, Colors, Utils
+from gameui.BoardRenderer import BoardRenderer
 from gameui.Config import Config
 from gameui.Hexagon import Hexagon
 from hexcore.Board import Team, Piece
+from hexcore.Engine import RemoteAI
 from hexcore.Game import Game
-from hexcore.Player import Human, AI
-
-
-class Utils:
-    """工具类"""
-
-    @staticmethod
-    def get_team_color(team: Team):
-        """获取队伍对应的颜色"""
-        if team == Team.RED:
-            return Colors.RED
-        elif team == Team.BLUE:
-            return Colors.BLUE
-        else:
-            return Colors.WHITE
+from hexcore.Player import Human
 
 
 class GameUI:
@@ -35,11 +23,11 @@ class GameUI:
         pygame.display.set_icon(Assets.img_logo)
         pygame.sysfont.initsysfonts()
         pygame.font.init()
-        pygame.fastevent.init()
         self.clock = pygame.time.Clock()
-        self.game = None
-        self.game_thread = None
+        self.game: Game = None
+        self.pending: Future = None  # 正在子进程中思考的 AI 的落子结果
         self.game_started = False  # 游戏开始了吗
+        self.renderer: BoardRenderer = None  # 棋盘渲染器, 第一次绘制棋盘时创建
 
         # 计算游戏框大小
         # width = (3n-1)*d*cos30, height = (n+1)*d+(n-1)*d*cos60
@@ -57,15 +45,25 @@ class GameUI:
         return text
 
     def event_handle(self):
-        """事件消息处理"""
+        """事件消息处理, 人类玩家的落子和重新开始都在这里处理, 不会阻塞事件循环"""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                exit(0)
-            # 消息转发给其它线程, 使用 fastevent 获取
-            pygame.fastevent.post(event)
-        # 界面变化部分重绘
-        pygame.display.flip()
+                self.quit()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
+                self.restart_game()  # 按 R 重新开始, 中止正在进行的搜索
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                self.when_human_operation()
+
+    def quit(self):
+        """退出游戏, 结束 AI 子进程"""
+        self.close_players()
+        pygame.quit()
+        exit(0)
+
+    def close_players(self):
+        """结束 AI 子进程, 可以重复调用"""
+        if self.game:
+            self.game.close()
 
     def draw_welcome_ui(self):
         """游戏欢迎界面"""
@@ -82,33 +80,22 @@ class GameUI:
                 if surf_start_rect.collidepoint(x, y):
                     self.game_started = True
             if event.type == pygame.QUIT:
-                pygame.quit()
-                exit(0)
+                self.quit()
 
     def draw_game_board(self):
-        """游戏棋盘界面"""
-        # 画出棋盘上下左右边界矩形
-        n = Config.board_size  # 棋盘一行的六边形数量
-        d = Config.hexagon_length  # 六边形边长
-        rect_width = (2 * n - 1) * d * math.cos(math.pi / 6)  # 上下矩形的宽度
-        rect_height = d * math.sin(math.pi / 6)  # 上下矩形的高度
-        bt_rect_start_x = n * d * math.cos(math.pi / 6)  # 底部矩形的起点 x 坐标
-        bt_rect_start_y = self.height - rect_height  # 底部矩形的起点 y 坐标
-        # 左右先画, 防止覆盖上下矩形部分区域
-        pygame.draw.rect(self.screen, Colors.BLUE, [0, rect_height, bt_rect_start_x, self.height])  # 左侧矩形
-        pygame.draw.rect(self.screen, Colors.BLUE, [rect_width, 0, self.width, self.height])  # 右侧背景
-        pygame.draw.rect(self.screen, Colors.RED, [0, 0, rect_width, rect_height])  # 上方矩形
-        pygame.draw.rect(self.screen, Colors.RED,
-                         [bt_rect_start_x, bt_rect_start_y, self.width, self.height])  # 下方矩形
-        # 画出棋盘
-        for row in range(Config.board_size):
-            for col in range(Config.board_size):
-                # 按棋盘矩阵的数据渲染棋盘颜色
-                team = self.game.board[row][col].team
-                hexagon = Hexagon(self.screen, row, col)
-                hexagon.draw(Utils.get_team_color(team))
-                # 动态绑定棋子与六边形对象
-                self.game.board[row][col].hexagon = hexagon
+        """游戏棋盘界面, 只重画发生变化的六边形"""
+        if self.renderer is None or self.renderer.size != Config.board_size:
+            self.renderer = BoardRenderer(self.screen, self.width, self.height, Config.board_size)
+        hover, hover_color, highlight = None, None, ()
+        if not self.game.judge.has_winner():
+            # 鼠标悬浮的位置如果没有棋子, 显示为当前下棋方的颜色
+            hover = self.get_hover_pos()
+            hover_color = Utils.get_team_color(self.game.get_current_player().team)
+        else:
+            highlight = self.game.judge.get_winner_path()  # 高亮胜利者路线
+        dirty = self.renderer.draw(self.game.board, hover, hover_color, highlight)
+        if dirty:
+            pygame.display.update(dirty)
 
     def draw_game_win_ui(self):
         """赢了"""
@@ -117,86 +104,101 @@ class GameUI:
         self.screen.blit(Assets.surf_game_win, [(self.width - Assets.surf_game_win.get_width()) / 2, self.height / 6])
         self.render_text_center(f"Winner: {win_team}", self.height - 100, Colors.BLACK)
 
-    def draw_winner_path(self):
-        """高亮胜利者路线"""
-        path = self.game.judge.get_winner_path()
-        for row, col in path:
-            piece = self.game.board[row][col]
-            if hasattr(piece, "hexagon"):
-                piece.hexagon.draw(Colors.YELLOW)
-
-    def game_loop(self):
-        """游戏主体的事件循环"""
-        # 鼠标悬浮事件检测, 如果这个位置没有棋子, 就设置其颜色为当前下棋方的颜色
+    def get_hover_pos(self):
+        """鼠标悬浮位置的六边形行列坐标, 不在棋盘上时返回 None"""
         x, y = pygame.mouse.get_pos()
-        cur_team = self.game.get_current_player().team
-        for piece in self.game.board.items():
-            if not hasattr(piece, "hexagon"):
-                continue  # 暂未绑定六边形
-            if piece.hexagon.collidepoint(x, y) and piece.team == Team.NONE:
-                piece.hexagon.draw(Utils.get_team_color(cur_team))
+        return Hexagon.locate(x, y, Config.board_size)
 
     def when_human_operation(self):
-        """人类玩家操作时的回调函数, 等待UI点击事件发生"""
-        while True:
-            # 改函数作为回调被后台线程的 game 对象调用, 为了监听主线程的事件循环, 需要使用 fastevent
-            event = pygame.fastevent.wait()  # 阻塞, 等待鼠标点击事件发生
-            if event.type != pygame.MOUSEBUTTONDOWN:
-                continue
-            x, y = pygame.mouse.get_pos()
-            player = self.game.get_current_player()  # 当前准备下棋的玩家
-            for piece in self.game.board.items():
-                if piece.hexagon.collidepoint(x, y):  # 玩家选择了一个落子点
-                    new_piece = Piece(*piece.hexagon.get_row_col())
-                    if player.set_piece(new_piece):  # 如果落子成功, 棋盘数据被修改, 后面会自动重绘
-                        return
-                    print(f"{player.team}: 落子失败 at {x, y} -> {piece.row, piece.col}")  # 落子失败
-
-    def start_game_thread(self):
-        """游戏线程"""
-        if self.game_thread:
-            return  # 已经启动
+        """鼠标点击时, 如果轮到人类玩家, 在点击的位置落子"""
+        if self.game is None or self.game.judge.has_winner():
+            return
+        player = self.game.get_current_player()  # 当前准备下棋的玩家
+        if not isinstance(player, Human):
+            return
+        x, y = pygame.mouse.get_pos()
+        pos = Hexagon.locate(x, y, Config.board_size)  # 玩家选择的落子点
+        if pos is None:
+            return
+        if player.set_piece(Piece(*pos)):  # 如果落子成功, 棋盘数据被修改, 后面会自动重绘
+            self.game.end_turn()
+        else:
+            print(f"{player.team}: 落子失败 at {x, y} -> {pos}")  # 落子失败
+
+    def when_ai_operation(self):
+        """轮到 AI 时在子进程中开始搜索, 之后每一帧检查搜索是否结束, 结束后落子"""
+        if self.game.judge.has_winner():
+            return
+        player = self.game.get_current_player()
+        if not isinstance(player, RemoteAI):
+            return
+        if self.pending is None:
+            self.pending = player.play()
+        if not self.pending.done():
+            return
+        future, self.pending = self.pending, None
+        if future.cancelled():
+            return
+        if player.set_piece(Piece(*future.result())):
+            self.game.end_turn()
+
+    def start_game(self):
+        """创建对局, 同一个界面中的 AI 子进程在多局之间复用"""
+        if self.game:
+            return  # 已经创建
 
         p1, p2 = None, None
         if Config.game_mode == 1:
             p1 = Human(Team.RED)
             p2 = Human(Team.BLUE)
-            p1.bind_play_operation(self.when_human_operation)
-            p2.bind_play_operation(self.when_human_operation)
         elif Config.game_mode == 2:
             p1 = Human(Team.RED)
-            p2 = AI(Team.BLUE)
-            p1.bind_play_operation(self.when_human_operation)
+            p2 = RemoteAI(Team.BLUE)
         elif Config.game_mode == 3:
-            p1 = AI(Team.BLUE)
-            p2 = AI(Team.RED)
+            # 机器对抗时双方交替搜索, 后台思考只会抢占对方的 CPU 时间
+            p1 = RemoteAI(Team.BLUE, ponder=False)
+            p2 = RemoteAI(Team.RED, ponder=False)
 
         self.game = Game(Config.board_size)
         self.game.set_player_one(p1)
         self.game.set_player_two(p2)
-        self.game_thread = Thread(target=self.game.start)
-        self.game_thread.start()
+        self.game.new_game()
+
+    def restart_game(self):
+        """放弃当前对局并重新开始, 正在思考的 AI 会中止搜索"""
+        if self.game is None:
+            return
+        self.pending = None
+        self.game.game_over()
+        self.game.new_game()
 
     def start(self):
-        """开始游戏"""
+        """开始游戏, 无论正常退出还是出现异常 (包括 AI 子进程返回的异常和 Ctrl-C), 都会结束 AI 子进程"""
+        try:
+            self.loop()
+        finally:
+            self.close_players()
+
+    def loop(self):
+        """游戏主循环"""
         while True:
             self.clock.tick(Config.fps)
             # 游戏没有开始, 显示欢迎界面
             if not self.game_started:
                 self.draw_welcome_ui()
-            else:
-                self.start_game_thread()
-                self.draw_game_board()
-                if not self.game.judge.has_winner():  # 目前无人获胜
-                    self.game_loop()
-                else:  # 有人赢了
-                    self.draw_winner_path()
-                    pygame.display.flip()  # 立刻重绘界面
-                    pygame.time.wait(2000)
-                    self.draw_game_win_ui()
-                    pygame.display.flip()
-                    pygame.time.wait(2000)
-                    self.game_started = False
-                    self.game_thread = None
-            # 事件处理, 界面重绘
+                pygame.display.flip()
+                continue
+
+            self.start_game()
+            self.when_ai_operation()
+            self.draw_game_board()  # 只更新变化的区域, 有人赢了时会高亮胜利者路线
+            if self.game.judge.has_winner():  # 有人赢了
+                pygame.time.wait(2000)
+                self.draw_game_win_ui()
+                pygame.display.flip()
+                pygame.time.wait(2000)
+                self.game_started = False
+                self.game.new_game()  # 回到欢迎界面, 下一局使用同一个对局对象
+                self.renderer.invalidate()  # 结算界面覆盖了棋盘, 下一局整屏重画
+            # 事件处理
             self.event_handle()
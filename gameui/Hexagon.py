@@ -1,4 +1,6 @@
 import math
+from typing import Optional, Tuple
+
 import pygame
 from pygame import Color
 from pygame.rect import Rect
@@ -16,7 +18,7 @@ class Hexagon:
         self.col = col
         self.points = []  # 六个顶点坐标
         self.line_thickness = Config.hexagon_line_thickness  # 六边形边框厚度
-        self.rect: Rect = None  # 用于碰撞检测的矩形区域
+        self.bounds: Rect = None  # 包含边框的外接矩形, 用于局部更新屏幕
 
         # 通过数组下标计算六边形中心坐标 (i, j) -> (cx, cy)
         # 算出来的公式是:
@@ -29,7 +31,6 @@ class Hexagon:
         # 通过六边形中心坐标计算六个顶点的坐标
         cos30 = math.cos(math.pi / 6)
         sin30 = math.sin(math.pi / 6)
-        sin60 = math.sin(math.pi / 3)
 
         self.points = [
             (cx, cy - d),  # P0, 中心点上方的顶点, 按顺时针编号
@@ -39,27 +40,44 @@ class Hexagon:
             (cx - d * cos30, cy + d * sin30),
             (cx - d * cos30, cy - d * sin30),  # P5, 左上角顶点
         ]
-        # 创建用于碰撞检测的矩形区域, 包括两个矩形
-        # 第一个矩形覆盖 P5 到 P2 区域, 第二个矩形用于弥补上下三角形空白区域
-        # 从左上角边的中点位置到右下角边的中点位置
-        rect_x, rect_y = self.points[5]  # 六边形左上角的顶点作为矩形的起点
-        rect_width, rect_height = 2 * d * sin60, d  # 矩形的宽和高
-        rect_h = Rect(rect_x, rect_y, rect_width, rect_height)
-        rect_x, rect_y = rect_x + d / 2 * cos30, rect_y - d / 2 * sin30  # 竖直矩形的起点, 六边形左上角边的中点
-        rect_width, rect_height = d * cos30, d + d * sin30  # 竖直矩形的宽和高
-        rect_v = Rect(rect_x, rect_y, rect_width, rect_height)
-        self.rect = rect_h.union(rect_v)  # 合并区域
+        # 点击检测使用 locate 的逆变换, 不再使用矩形近似
+        self.bounds = Rect(cx - d * cos30, cy - d, 2 * d * cos30, 2 * d).inflate(2 * self.line_thickness + 2,
+                                                                             2 * self.line_thickness + 2)
 
     def get_row_col(self):
         """获取行列坐标"""
         return self.row, self.col
 
-    def draw(self, fill_color: Color, board_color: Color = Colors.BLACK):
-        """绘制六边形"""
-        pygame.draw.polygon(self.screen, fill_color, self.points)  # 填充六边形内部颜色
-        pygame.draw.polygon(self.screen, board_color, self.points, self.line_thickness)  # 重绘边框
+    def draw(self, fill_color: Color, board_color: Color = Colors.BLACK, surface: pygame.Surface = None):
+        """绘制六边形, 默认画在屏幕上"""
+        surface = surface or self.screen
+        pygame.draw.polygon(surface, fill_color, self.points)  # 填充六边形内部颜色
+        pygame.draw.polygon(surface, board_color, self.points, self.line_thickness)  # 重绘边框
+
+    def collidepoint(self, x: float, y: float) -> bool:
+        """检测坐标是否在六边形内部, 边界精确到六条边"""
+        return Hexagon.locate(x, y) == (self.row, self.col)
 
-    def collidepoint(self, x: float, y: float) -> int:
-        """检测坐标是否在六边形内部"""
-        # 懒得计算点到六条边的距离了, 这里直接用矩形区域模拟
-        return self.rect.collidepoint(x, y)
+    @staticmethod
+    def locate(x: float, y: float, board_size: int = None) -> Optional[Tuple[int, int]]:
+        """
+        屏幕坐标转换为所在六边形的行列坐标, 常数时间
+        中心坐标公式 X = (i+2*j+1)*d*cos30, Y = (i+1)*d + i*d*sin30 的逆变换得到小数的行列坐标,
+        再按立方坐标 (j, i, -i-j) 取整到最近的六边形中心, 六边形铺满平面, 最近中心所在的六边形就是点所在的六边形
+        :param board_size: 棋盘大小, 给出时坐标不在棋盘上返回 None
+        """
+        d = Config.hexagon_length
+        row = (y - d) / (1.5 * d)
+        col = (x / (d * math.cos(math.pi / 6)) - 1 - row) / 2
+        # 立方坐标取整: 三个分量分别取整, 误差最大的分量由另外两个分量推出
+        cube_x, cube_z = col, row
+        cube_y = -cube_x - cube_z
+        rx, ry, rz = round(cube_x), round(cube_y), round(cube_z)
+        dx, dy, dz = abs(rx - cube_x), abs(ry - cube_y), abs(rz - cube_z)
+        if dx > dy and dx > dz:
+            rx = -ry - rz
+        elif dz >= dy:
+            rz = -rx - ry
+        if board_size is not None and not (0 <= rz < board_size and 0 <= rx < board_size):
+            return None
+        return rz, rx
@@ -1,15 +1,53 @@
-from copy import deepcopy
+from array import array
+from functools import lru_cache
 from math import log, sqrt
-from queue import Queue
-from random import choice
-from time import process_time
-from typing import List, Iterator, Callable, Tuple
+from collections import deque, OrderedDict
+from random import choice, shuffle, Random
+from time import perf_counter, time
+from sys import getsizeof
+from typing import List, Iterator, Callable, Tuple, Optional, NamedTuple
+
+from hexcore.Board import Snapshot
 
 Pos = Tuple[int, int]
 State = List[List[int]]
 RedTeam, BlueTeam, NoneTeam = -1, 1, 0
 
 
+@lru_cache(maxsize=None)
+def neighbor_table(size: int) -> Tuple[Tuple[int, ...], ...]:
+    """
+    计算棋盘上每个位置的邻居下标, 位置 (row, col) 对应的下标为 row * size + col
+    同一种棋盘大小只计算一次, 所有 BoardState 共享同一张表
+    :param size: 棋盘大小
+    :return: table[index] 为该位置在棋盘范围内的邻居下标
+    """
+    directions = [(1, 0), (1, -1), (0, 1), (0, -1), (-1, 1), (-1, 0)]  # 棋子的六个移动方向
+    table = []
+    for row in range(size):
+        for col in range(size):
+            neighbors = []
+            for dx, dy in directions:
+                r, c = row + dx, col + dy
+                if 0 <= r < size and 0 <= c < size:  # 只保留棋盘范围内的坐标
+                    neighbors.append(r * size + c)
+            table.append(tuple(neighbors))
+    return tuple(table)
+
+
+@lru_cache(maxsize=None)
+def zobrist_table(size: int) -> Tuple[Tuple[int, ...], Tuple[int, ...], int]:
+    """
+    Zobrist 哈希使用的随机数表, 使用固定的随机种子, 同样大小的棋盘在不同进程中得到相同的哈希值
+    :param size: 棋盘大小
+    :return: 红方每个位置的随机数, 蓝方每个位置的随机数, 轮到蓝方下棋时的随机数
+    """
+    rand = Random(size)
+    red_keys = tuple(rand.getrandbits(64) for _ in range(size * size))
+    blue_keys = tuple(rand.getrandbits(64) for _ in range(size * size))
+    return red_keys, blue_keys, rand.getrandbits(64)
+
+
 class BFS:
     """广度优先搜索算法, 用于裁判判断棋子是否联通两个边界, 并获取联通的路径"""
 
@@ -40,12 +78,11 @@ class BFS:
         :param stop_condition: 搜索结束条件, 用于指定终点位置
         :return: 起点到终点的路径
         """
-        queue = Queue()
+        queue = deque([start])  # 起点位置入队 x,y, 单线程使用, 不需要带锁的 Queue
         visited = {}  # 记录已访问的结点, key 为结点坐标x,y, value 为其上一级结点坐标x,y
-        queue.put(start)  # 起点位置入队 x,y
         visited[start] = (-1, -1)  # 起点已经访问, 无上级结点
-        while not queue.empty():  # 如果队列未空
-            node = queue.get()  # 队头结点出队
+        while queue:  # 如果队列未空
+            node = queue.popleft()  # 队头结点出队
             if stop_condition(node):  # 如果 node 已经是终点
                 path = []  # 记录起点到终点的路径
                 pre = node  # 从终点反推回起点
@@ -57,7 +94,7 @@ class BFS:
             # 把 node 相邻的, 且没有访问过的结点入队
             for nb in self.get_neighbors(node, team):
                 if nb not in visited:
-                    queue.put(nb)
+                    queue.append(nb)
                     visited[nb] = node  # 记录相邻结点的上一级结点
         return []
 
@@ -99,38 +136,59 @@ class BFS:
 
 
 class UnionFind:
-    """带权路径压缩的并查集"""
-
-    def __init__(self):
-        self.parent = {}  # 存储结点之间的关系
-        self.rank = {}  # 存储结点对应的树高
+    """
+    带权路径压缩的并查集
+    结点为一维棋盘的下标 0 ~ size * size - 1, 另外追加两个虚拟结点表示棋盘的两条边界
+    parent 和 rank 都是预先分配好的数组, 复制和重置只需要一次切片
+    """
 
+    def __init__(self, size: int):
+        self.size = size
         # edge_one 和 edge_two 用做标记, 当棋子落在己方边界位置, 就与对应的 edge 连接
         # 最后判断 edge_one 和 edge_two 是否连接即可知道棋盘两个边界是否联通
-        self.edge_one = (-1, -1)
-        self.edge_two = (-2, -2)
-        self.parent[self.edge_one] = self.edge_one
-        self.parent[self.edge_two] = self.edge_two
-        self.rank[self.edge_one] = 0
-        self.rank[self.edge_two] = 0
-
-    def find(self, x: Pos) -> Pos:
-        """查找结点的根节点(代表元), 如果没找到就加入并查集, 查找过程中会进行路径压缩"""
-        if x not in self.parent:  # 元素不存在
-            self.parent[x] = x
-            self.rank[x] = 0
-
-        while x != self.parent[x]:  # 还没有达到根节点
-            gx = self.parent[self.parent[x]]  # 祖父结点
-            self.parent[x] = gx  # 隔代压缩, 减小树高
+        self.edge_one = size * size
+        self.edge_two = size * size + 1
+        parent, rank = self.template(size)
+        self.parent = parent[:]  # 存储结点之间的关系
+        self.rank = rank[:]  # 存储结点对应的树高
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def template(size: int) -> Tuple[List[int], List[int]]:
+        """初始状态的 parent 和 rank 数组, 每种棋盘大小只创建一次, 使用时需要复制"""
+        count = size * size + 2
+        return list(range(count)), [0] * count
+
+    def reset(self):
+        """恢复到初始状态, 所有结点互不联通"""
+        parent, rank = self.template(self.size)
+        self.parent[:] = parent
+        self.rank[:] = rank
+
+    def copy(self) -> 'UnionFind':
+        """复制并查集"""
+        uf = UnionFind.__new__(UnionFind)
+        uf.size = self.size
+        uf.edge_one = self.edge_one
+        uf.edge_two = self.edge_two
+        uf.parent = self.parent[:]
+        uf.rank = self.rank[:]
+        return uf
+
+    def find(self, x: int) -> int:
+        """查找结点的根节点(代表元), 查找过程中会进行路径压缩"""
+        parent = self.parent
+        while x != parent[x]:  # 还没有达到根节点
+            gx = parent[parent[x]]  # 祖父结点
+            parent[x] = gx  # 隔代压缩, 减小树高
             x = gx
         return x
 
-    def connected(self, x: Pos, y: Pos) -> bool:
+    def connected(self, x: int, y: int) -> bool:
         """判断两个结点是否联通"""
         return self.find(x) == self.find(y)  # 根节点则联通
 
-    def union(self, x: Pos, y: Pos) -> bool:
+    def union(self, x: int, y: int) -> bool:
         """连接两个元素"""
         rx = self.find(x)  # x 的根节点
         ry = self.find(y)
@@ -139,20 +197,21 @@ class UnionFind:
             return False
 
         # 将对应树高小的结点挂到树高大的结点上, 降低合并后的树高
-        if self.rank[rx] < self.rank[ry]:
+        rank = self.rank
+        if rank[rx] < rank[ry]:
             self.parent[rx] = ry
-        elif self.rank[rx] > self.rank[ry]:
+        elif rank[rx] > rank[ry]:
             self.parent[ry] = rx
         else:  # 一样高, 随便挂, 整体树高 +1
             self.parent[rx] = ry
-            self.rank[ry] += 1
+            rank[ry] += 1
         return True
 
-    def union_edge_one(self, p: Pos):
+    def union_edge_one(self, p: int):
         """将结点 p 与标记位置 1 联通"""
         return self.union(self.edge_one, p)
 
-    def union_edge_two(self, p: Pos):
+    def union_edge_two(self, p: int):
         """将结点 p 与标记位置 2 联通"""
         return self.union(self.edge_two, p)
 
@@ -161,20 +220,162 @@ class UnionFind:
         return self.connected(self.edge_one, self.edge_two)
 
 
+class NodePool:
+    """
+    结构数组形式的结点池, 蒙特卡洛搜索树的全部结点都保存在这里
+    每个字段是一列预先分配好的数组, 结点用整数下标表示, 不再为每个结点创建一个 Python 对象
+    同一个结点的子节点在数组中连续存放, 用 first_child 和 child_count 表示子节点区间
+    """
+
+    # 列名和对应的数组类型, move 为一维棋盘下标, parent 为 -1 表示没有父节点, first_child 为 -1 表示没有展开
+    # amaf_visits 和 amaf_reward 为 RAVE 统计: 该结点的落子在模拟中任意时刻被同一方下出的次数和其中获胜的次数
+    # hash 为该结点对应棋盘的 Zobrist 哈希值, 只有使用置换表时才会计算
+    columns = [("move", "i"), ("team", "b"), ("parent", "i"), ("first_child", "i"),
+               ("child_count", "i"), ("visits", "q"), ("reward", "q"), ("amaf_visits", "q"), ("amaf_reward", "q"),
+               ("hash", "Q")]
+    # 新结点需要清零的统计列, 其余列在初始化时直接写入
+    counters = [(column, fmt, array(fmt).itemsize) for column, fmt in columns
+                if column not in ("move", "team", "parent", "first_child")]
+
+    def __init__(self, size: int, capacity: int = 4096):
+        """
+        :param size: 棋盘大小, 用于把下标转换为坐标
+        :param capacity: 初始容量, 不够时自动翻倍
+        """
+        self.size = size
+        self.capacity = capacity
+        self.count = 0  # 已分配的结点数量
+        for column, fmt in self.columns:
+            setattr(self, column, array(fmt, bytes(capacity * array(fmt).itemsize)))
+
+    def grow(self, capacity: int):
+        """扩容到至少 capacity 个结点"""
+        new_capacity = self.capacity
+        while new_capacity < capacity:
+            new_capacity *= 2
+        for column, fmt in self.columns:
+            getattr(self, column).extend(array(fmt, bytes((new_capacity - self.capacity) * array(fmt).itemsize)))
+        self.capacity = new_capacity
+
+    def allocate(self, count: int) -> int:
+        """分配 count 个连续的结点, 返回第一个结点的下标, 结点的字段需要由调用方初始化"""
+        first = self.count
+        if first + count > self.capacity:
+            self.grow(first + count)
+        self.count = first + count
+        return first
+
+    def new_node(self, move: int, team: int, parent: int) -> int:
+        """创建一个结点, 返回其下标"""
+        node = self.allocate(1)
+        self.init_node(node, move, team, parent)
+        return node
+
+    def add_children(self, parent: int, moves: List[int], team: int) -> int:
+        """为结点添加一组连续存放的子节点, 返回第一个子节点的下标, 空间不足时返回 -1"""
+        count = len(moves)
+        first = self.allocate(count)
+        if first < 0:
+            return first
+        # 子节点连续存放, 每一列用一次切片赋值初始化整个区间, 不再逐个结点逐列写入
+        end = first + count
+        for column, fmt, itemsize in self.counters:
+            getattr(self, column)[first:end] = array(fmt, bytes(count * itemsize))
+        self.move[first:end] = array("i", moves)
+        self.team[first:end] = array("b", [team]) * count
+        self.parent[first:end] = array("i", [parent]) * count
+        self.first_child[first:end] = array("i", [-1]) * count
+        # 先写入子节点数量再写入 first_child, 其它进程看到 first_child 时子节点已经完整
+        self.child_count[parent] = len(moves)
+        self.first_child[parent] = first
+        return first
+
+    def init_node(self, node: int, move: int, team: int, parent: int):
+        """初始化结点的全部字段"""
+        for column, _ in self.columns:
+            getattr(self, column)[node] = 0
+        self.move[node], self.team[node], self.parent[node] = move, team, parent
+        self.first_child[node] = -1
+
+    def children(self, node: int) -> range:
+        """结点的子节点下标区间"""
+        first = self.first_child[node]
+        return range(first, first + self.child_count[node]) if first >= 0 else range(0)
+
+    def extract(self, node: int) -> 'NodePool':
+        """把以 node 为根的子树复制到新的结点池中, 新的根结点下标为 0, 其它分支不会被复制"""
+        pool = NodePool(self.size, max(self.capacity // 2, 1024))
+        columns = [(getattr(pool, column), getattr(self, column)) for column, _ in self.columns]
+        pool.allocate(1)
+        queue = deque([(node, 0)])  # (旧下标, 新下标)
+        while queue:
+            old, new = queue.popleft()
+            for target, source in columns:
+                target[new] = source[old]
+            if self.child_count[old]:
+                first = pool.allocate(self.child_count[old])
+                pool.first_child[new] = first
+                for offset, child in enumerate(self.children(old)):
+                    queue.append((child, first + offset))
+        # 修正复制后的父节点下标
+        pool.parent[0] = -1
+        for new in range(pool.count):
+            for child in pool.children(new):
+                pool.parent[child] = new
+        return pool
+
+    @property
+    def bytes_per_node(self) -> int:
+        """每个结点占用的字节数"""
+        return sum(array(fmt).itemsize for _, fmt in self.columns)
+
+    @property
+    def nbytes(self) -> int:
+        """结点池占用的总字节数"""
+        return self.capacity * self.bytes_per_node
+
+
 class Node:
     """
-    蒙特卡洛搜索树的结点
-    保存了一些必要信息, 为了减少不必要的拷贝, 结点内**没有**保存每一步的棋盘状态
-    结点的更新操作交给 MCTS 类实现
+    蒙特卡洛搜索树的结点, 是 NodePool 中一个结点的只读视图, 仅用于调试和查看搜索结果
+    搜索过程直接使用结点池中的整数下标
     """
 
-    def __init__(self, move: Pos = None, team: int = NoneTeam, parent=None):
-        self.move = move  # 落子位置
-        self.team = team  # 棋子所属队伍
-        self.parent = parent  # 父节点
-        self.visits = 0  # 该结点被访问的次数
-        self.reward = 0  # 该结点处的获胜次数
-        self.children = []  # 子节点
+    def __init__(self, pool: NodePool, index: int):
+        self.pool = pool
+        self.index = index
+
+    @property
+    def move(self) -> Pos:
+        """落子位置"""
+        move = self.pool.move[self.index]
+        return divmod(move, self.pool.size) if move >= 0 else (-1, -1)
+
+    @property
+    def team(self) -> int:
+        """棋子所属队伍"""
+        return self.pool.team[self.index]
+
+    @property
+    def parent(self) -> Optional['Node']:
+        """父节点"""
+        parent = self.pool.parent[self.index]
+        return Node(self.pool, parent) if parent >= 0 else None
+
+    @property
+    def visits(self) -> int:
+        """该结点被访问的次数"""
+        return self.pool.visits[self.index]
+
+    @property
+    def reward(self) -> int:
+        """该结点处的获胜次数"""
+        return self.pool.reward[self.index]
+
+    @property
+    def children(self) -> List['Node']:
+        """子节点"""
+        return [Node(self.pool, child) for child in self.pool.children(self.index)]
 
     @property
     def value(self):
@@ -184,27 +385,281 @@ class Node:
         # exploitation + exploration
         return self.reward / self.visits + 0.5 * sqrt(2 * log(self.parent.visits) / self.visits)
 
+    def __repr__(self):
+        return f"Node(move={self.move}, team={self.team}, visits={self.visits}, reward={self.reward})"
+
+
+class TranspositionTable:
+    """
+    置换表, 以棋盘的 Zobrist 哈希值为键, 保存该局面的访问次数和获胜次数
+    不同落子顺序得到的相同局面共享同一份统计信息, 超过容量时淘汰最久没有使用的局面
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity  # 最多保存的局面数量
+        self.table: OrderedDict = OrderedDict()  # {hash: [visits, reward]}
+        self.lookups = 0  # 查询次数
+        self.hits = 0  # 命中次数, 只统计真正共享了其它结点统计信息的查询
+
+    def get(self, key: int, own_visits: int = 0) -> Optional[List[int]]:
+        """
+        查询局面的统计信息, 不存在时返回 None
+        :param own_visits: 查询的结点自身的访问次数, 表项的访问次数超过它时才算作命中,
+                           否则表项里只有这个结点自己的统计信息, 并没有发生置换
+        """
+        self.lookups += 1
+        entry = self.table.get(key)
+        if entry is not None:
+            if entry[0] > own_visits:
+                self.hits += 1
+            self.table.move_to_end(key)
+        return entry
+
+    def update(self, key: int, visits: int, reward: int):
+        """累加局面的统计信息, 不存在时插入, 超过容量时淘汰最久没有使用的局面"""
+        entry = self.table.get(key)
+        if entry is None:
+            self.table[key] = [visits, reward]
+            if len(self.table) > self.capacity:
+                self.table.popitem(last=False)
+        else:
+            entry[0] += visits
+            entry[1] += reward
+            self.table.move_to_end(key)
+
+    @property
+    def hit_rate(self) -> float:
+        """查询命中率"""
+        return self.hits / self.lookups if self.lookups else 0
+
+    @property
+    def nbytes(self) -> int:
+        """置换表占用内存的估计值, 包括字典本身和每个局面的键与统计列表"""
+        if not self.table:
+            return getsizeof(self.table)
+        key, entry = next(iter(self.table.items()))
+        return getsizeof(self.table) + len(self.table) * (getsizeof(key) + getsizeof(entry) + 2 * getsizeof(entry[0]))
+
+
+class Statistics(NamedTuple):
+    """一次搜索的开销信息"""
+    simulate_times: int  # 模拟次数
+    node_count: int  # 树的结点数量
+    run_time: float  # 运行时间
+    tt_hit_rate: float = 0  # 置换表命中率
+    tt_bytes: int = 0  # 置换表占用的内存
+
+
+class SearchProfile:
+    """
+    MCTS.search 的分阶段统计, 只有创建 MCTS 时打开 profile 才会记录
+    copy 为复制根结点棋盘状态, select 为沿树向下选择(不含展开), 其余阶段与 MCTS 的方法对应
+    """
+
+    phases = ("copy", "select", "expand", "simulate", "back_propagate")
+
+    def __init__(self):
+        self.time = dict.fromkeys(self.phases, 0.0)  # 每个阶段的累计耗时/秒
+        self.calls = dict.fromkeys(self.phases, 0)  # 每个阶段的调用次数
+        self.iterations = 0  # 搜索迭代次数
+        self.depth_total = 0  # 选中结点的深度之和
+        self.rollout_total = 0  # 模拟开始时空白位置数量之和, 即模拟需要下的步数
+        self.expansions = 0  # 成功展开的次数
+        self.children_total = 0  # 展开时添加的子节点数量之和
+
+    def reset(self):
+        """清空统计信息"""
+        self.__init__()
+
+    def add(self, phase: str, seconds: float):
+        """记录一次阶段耗时"""
+        self.time[phase] += seconds
+        self.calls[phase] += 1
+
+    @property
+    def average_depth(self) -> float:
+        """选中结点的平均深度"""
+        return self.depth_total / self.iterations if self.iterations else 0
+
+    @property
+    def average_rollout_length(self) -> float:
+        """平均每次模拟需要下的步数"""
+        return self.rollout_total / self.iterations if self.iterations else 0
+
+    @property
+    def branching_factor(self) -> float:
+        """平均每次展开添加的子节点数量"""
+        return self.children_total / self.expansions if self.expansions else 0
+
+    def as_dict(self) -> dict:
+        """转换为字典, 便于输出为 JSON"""
+        return {
+            "time": dict(self.time),
+            "calls": dict(self.calls),
+            "iterations": self.iterations,
+            "average_depth": self.average_depth,
+            "average_rollout_length": self.average_rollout_length,
+            "branching_factor": self.branching_factor,
+        }
+
+    def __str__(self):
+        total = sum(self.time.values()) or 1
+        lines = [f"{phase:>15}: {self.time[phase]:.3f}s ({self.time[phase] / total:6.1%}) calls={self.calls[phase]}"
+                 for phase in self.phases]
+        lines.append(f"{'tree':>15}: iterations={self.iterations}, average_depth={self.average_depth:.2f}, "
+                     f"average_rollout_length={self.average_rollout_length:.1f}, "
+                     f"branching_factor={self.branching_factor:.1f}")
+        return "\n".join(lines)
+
+
+class SearchTimer:
+    """
+    MCTS.search 的计时器, 使用墙上时间
+    除了时间上限, 还支持绝对的截止时间、最佳落子确定之后提前结束、最佳落子不稳定时延长搜索
+    """
+
+    check_interval = 64  # 每隔多少次迭代检查一次是否可以提前结束
+
+    def __init__(self, mcts: 'MCTS', time_limit: float, deadline: float = None, early_stop: bool = False,
+                 extend: float = 0, cancelled: Callable[[], bool] = None):
+        """
+        :param time_limit: 搜索时间上限/秒
+        :param deadline: 绝对的截止时间, 与 time.time() 比较, 任何情况下都不会超过
+        :param early_stop: 剩余时间内 reward 最大的子节点已经不可能改变时提前结束
+        :param extend: 时间用完时如果 reward 最大的子节点不是访问次数最多的子节点, 最多延长的时间/秒
+        :param cancelled: 返回 True 时立即结束搜索, 每隔 check_interval 次迭代检查一次
+        """
+        self.mcts = mcts
+        self.start_time = perf_counter()
+        self.hard_end = float('inf') if deadline is None else self.start_time + deadline - time()
+        self.end_time = min(self.start_time + time_limit, self.hard_end)
+        self.early_stop = early_stop
+        self.extend = extend
+        self.stopped_early = False  # 是否因为最佳落子已经确定而提前结束
+        self.extended = False  # 是否延长了搜索时间
+        self.cancelled = cancelled
+
+    def running(self, iterations: int, simulate_times: int) -> bool:
+        """是否继续搜索, 时间已经用完或者截止时间已过也至少完成一次迭代, 保证根结点已经展开, best_move 有结果"""
+        if not iterations:
+            return True
+        if self.cancelled and iterations % self.check_interval == 0 and self.cancelled():
+            return False
+        now = perf_counter()
+        if now >= self.end_time:
+            if self.extend and not self.extended and now < self.hard_end and not self.stable():
+                self.extended = True
+                self.end_time = min(now + self.extend, self.hard_end)
+                return True
+            return False
+        if self.early_stop and iterations % self.check_interval == 0:
+            remaining = self.end_time - now + (0 if self.extended else self.extend)
+            rate = simulate_times / max(now - self.start_time, 1e-9)
+            if self.decided(rate * remaining):
+                self.stopped_early = True
+                return False
+        return True
+
+    def decided(self, remaining_simulations: float) -> bool:
+        """reward 最大的子节点领先第二名的值超过剩余的模拟次数, 剩余时间内不可能被超过"""
+        reward = self.mcts.pool.reward
+        rewards = sorted((reward[child] for child in self.mcts.pool.children(self.mcts.root)), reverse=True)
+        if len(rewards) < 2:
+            return len(rewards) == 1
+        return rewards[0] - rewards[1] > remaining_simulations
+
+    def stable(self) -> bool:
+        """reward 最大的子节点同时也是访问次数最多的子节点"""
+        pool = self.mcts.pool
+        children = pool.children(self.mcts.root)
+        if not children:
+            return True
+        reward, visits = pool.reward, pool.visits
+        return visits[max(children, key=reward.__getitem__)] == max(visits[child] for child in children)
+
+    @property
+    def elapsed(self) -> float:
+        """已经搜索的时间/秒"""
+        return perf_counter() - self.start_time
+
 
 class BoardState:
     """棋盘状态类
     保存了当前棋盘的状态, 下棋方, 棋盘状态对应的并查集(用于判断胜利者)
     提供了一些对棋盘状态修改的方法
+    棋盘使用一维数组保存, 位置 (row, col) 对应下标 row * size + col, 复制时只需要一次切片
     """
 
     def __init__(self, state: State, turn: int):
-        self.state = deepcopy(state)  # 当前棋盘状态, 二维数组
         self.size = len(state)  # 棋盘大小
+        self.cells = array('b', [team for row in state for team in row])  # 当前棋盘状态, 一维数组
+        self.neighbors = neighbor_table(self.size)  # 邻居下标表, 同样大小的棋盘共享
+        self.zobrist = zobrist_table(self.size)  # Zobrist 哈希使用的随机数表
         self.turn = turn  # 当前下棋方
-        self.red_uf = UnionFind()  # 红方的并查集
-        self.blue_uf = UnionFind()  # 蓝方的并查集
+        self.red_uf = UnionFind(self.size)  # 红方的并查集
+        self.blue_uf = UnionFind(self.size)  # 蓝方的并查集
         self.init_union_find()
+        self.hash = self.compute_hash()  # 棋盘的 Zobrist 哈希值, 落子时增量更新
+
+    @classmethod
+    def from_cells(cls, cells: array, size: int, turn: int) -> 'BoardState':
+        """使用一维棋盘数组创建棋盘状态, cells 不会被复制"""
+        board_state = cls.__new__(cls)
+        board_state.size = size
+        board_state.cells = cells
+        board_state.neighbors = neighbor_table(size)
+        board_state.zobrist = zobrist_table(size)
+        board_state.turn = turn
+        board_state.red_uf = UnionFind(size)
+        board_state.blue_uf = UnionFind(size)
+        board_state.init_union_find()
+        board_state.hash = board_state.compute_hash()
+        return board_state
+
+    def copy(self) -> 'BoardState':
+        """复制棋盘状态, 棋盘数组和并查集都只做一次切片, 不需要根据棋盘重建并查集"""
+        board_state = BoardState.__new__(BoardState)
+        board_state.size = self.size
+        board_state.cells = self.cells[:]
+        board_state.neighbors = self.neighbors
+        board_state.zobrist = self.zobrist
+        board_state.turn = self.turn
+        board_state.red_uf = self.red_uf.copy()
+        board_state.blue_uf = self.blue_uf.copy()
+        board_state.hash = self.hash
+        return board_state
+
+    def compute_hash(self) -> int:
+        """根据棋盘和下棋方计算 Zobrist 哈希值"""
+        red_keys, blue_keys, turn_key = self.zobrist
+        value = turn_key if self.turn == BlueTeam else 0
+        for index, team in enumerate(self.cells):
+            if team == RedTeam:
+                value ^= red_keys[index]
+            elif team == BlueTeam:
+                value ^= blue_keys[index]
+        return value
+
+    def canonical_hash(self) -> Tuple[int, bool]:
+        """
+        棋盘旋转 180 度之后与原棋盘等价, 取两者哈希值中较小的一个作为标准哈希值
+        旋转后位置 index 对应 size * size - 1 - index
+        :return: 标准哈希值, 是否使用了旋转后的棋盘
+        """
+        red_keys, blue_keys, turn_key = self.zobrist
+        last = len(self.cells) - 1
+        rotated = turn_key if self.turn == BlueTeam else 0
+        for index, team in enumerate(self.cells):
+            if team == RedTeam:
+                rotated ^= red_keys[last - index]
+            elif team == BlueTeam:
+                rotated ^= blue_keys[last - index]
+        return (rotated, True) if rotated < self.hash else (self.hash, False)
 
     def init_union_find(self):
         """根据棋盘状态, 初始化对应的并查集"""
-        for row in range(self.size):
-            for col in range(self.size):
-                turn = self.state[row][col]
-                self.update_union_find((row, col), turn)
+        for index, turn in enumerate(self.cells):
+            self.update_union_find(index, turn)
 
     def get_winner(self) -> int:
         """使用并查集判断获胜者"""
@@ -214,20 +669,36 @@ class BoardState:
             return BlueTeam
         return NoneTeam
 
-    def get_neighbors(self, pos: Pos, team: int) -> Iterator[Pos]:
+    def get_full_board_winner(self) -> int:
+        """
+        棋盘下满之后判断获胜者, 只做一次连通性搜索, 不依赖并查集
+        下满的 Hex 棋盘有且只有一方获胜, 所以只需要检查红方是否联通上下边界
+        """
+        size, cells, neighbors = self.size, self.cells, self.neighbors
+        stack = [col for col in range(size) if cells[col] == RedTeam]  # 从第一行(红方上边界)的红子出发
+        visited = set(stack)
+        last_row = size * (size - 1)  # 最后一行第一个位置的下标
+        while stack:
+            index = stack.pop()
+            if index >= last_row:  # 到达红方下边界
+                return RedTeam
+            for nb in neighbors[index]:
+                if nb not in visited and cells[nb] == RedTeam:
+                    visited.add(nb)
+                    stack.append(nb)
+        return BlueTeam
+
+    def get_neighbors(self, index: int, team: int) -> Iterator[int]:
         """
         获取棋子的邻居列表
-        :param pos: 棋子坐标
+        :param index: 棋子在一维棋盘中的下标
         :param team: 棋子所属队伍
-        :return: 邻居坐标列表
+        :return: 邻居下标列表
         """
-        directions = [(1, 0), (1, -1), (0, 1), (0, -1), (-1, 1), (-1, 0)]  # 棋子的六个移动方向
-        for dx, dy in directions:
-            row, col = pos[0] + dx, pos[1] + dy
-            if not (0 <= row < self.size and 0 <= col < self.size):  # 如果坐标不在棋盘范围内, 无效
-                continue
-            if team == self.state[row][col]:  # 如果属于同一方, 是邻接棋子
-                yield row, col
+        cells = self.cells
+        for nb in self.neighbors[index]:
+            if cells[nb] == team:  # 如果属于同一方, 是邻接棋子
+                yield nb
 
     def change_turn(self):
         """交换下棋方"""
@@ -236,115 +707,358 @@ class BoardState:
         elif self.turn == BlueTeam:
             self.turn = RedTeam
 
-    def update_union_find(self, move: Pos, turn: int):
-        """更新并查集状态, 尝试将给定坐标与并查集中的结点联通"""
+    def update_union_find(self, index: int, turn: int):
+        """更新并查集状态, 尝试将给定下标与并查集中的结点联通"""
         if turn == NoneTeam:
             return
 
-        row, col = move
+        row, col = divmod(index, self.size)
         if turn == RedTeam:
             if row == 0:  # 红队棋子下在第一行(红方上边界)
-                self.red_uf.union_edge_one(move)
+                self.red_uf.union_edge_one(index)
             if row == self.size - 1:  # 红队棋子下在最后一行(红方下边界)
-                self.red_uf.union_edge_two(move)
+                self.red_uf.union_edge_two(index)
             # 棋子下在非边界位置, 将它与邻居连接起来
-            for nb in self.get_neighbors(move, turn):
-                self.red_uf.union(move, nb)
+            for nb in self.get_neighbors(index, turn):
+                self.red_uf.union(index, nb)
 
         elif turn == BlueTeam:
             if col == 0:
-                self.blue_uf.union_edge_one(move)
+                self.blue_uf.union_edge_one(index)
             if col == self.size - 1:
-                self.blue_uf.union_edge_two(move)
-            for nb in self.get_neighbors(move, turn):
-                self.blue_uf.union(move, nb)
+                self.blue_uf.union_edge_two(index)
+            for nb in self.get_neighbors(index, turn):
+                self.blue_uf.union(index, nb)
 
     def set_piece(self, move: Pos):
         """下一步棋, 修改棋盘的状态, 更新并查集"""
         row, col = move
-        self.state[row][col] = self.turn
-        self.update_union_find(move, self.turn)
+        self.play(row * self.size + col)
+
+    def play(self, index: int):
+        """在一维棋盘的下标处下一步棋"""
+        red_keys, blue_keys, turn_key = self.zobrist
+        self.hash ^= (red_keys if self.turn == RedTeam else blue_keys)[index] ^ turn_key
+        self.cells[index] = self.turn
+        self.update_union_find(index, self.turn)
         self.change_turn()
 
+    def empty_indices(self) -> List[int]:
+        """空白位置的一维棋盘下标"""
+        return [index for index, team in enumerate(self.cells) if team == NoneTeam]
+
+    def fill(self, order: List[int]):
+        """
+        按顺序双方轮流落子, 当前下棋方先落子, 用于一次性填满棋盘
+        不更新并查集、哈希值和下棋方, 之后只能用 get_full_board_winner 判断胜负
+        """
+        cells = self.cells
+        for index in order[0::2]:
+            cells[index] = self.turn
+        for index in order[1::2]:
+            cells[index] = -self.turn
+
     def get_moves(self) -> List[Pos]:
         """获取可以下棋的位置"""
-        moves = []
-        for row in range(self.size):
-            for col in range(self.size):
-                if self.state[row][col] == NoneTeam:
-                    moves.append((row, col))
-        return moves
+        size = self.size
+        return [divmod(index, size) for index in self.empty_indices()]
 
     def print(self):
         for row in range(self.size):
             for col in range(self.size):
-                print(self.state[row][col], end='\t')
+                print(self.cells[row * self.size + col], end='\t')
             print()
 
 
+def board_class(name: str):
+    """
+    按名字获取棋盘状态的实现
+    array 为一维数组加并查集, bitboard 为位棋盘, 两者接口相同
+    """
+    if name == "array":
+        return BoardState
+    if name == "bitboard":
+        from hexcore.BitBoard import BitBoardState
+        return BitBoardState
+    raise ValueError(f"unknown board: {name}")
+
+
 class MCTS:
     """
     蒙特卡洛搜索树
+    结点保存在 NodePool 中, 选择、展开、反向传播都直接操作结点下标
     """
 
-    def __init__(self, init_state, turn: int):
-        self.root_state = BoardState(init_state, turn)
-        self.root = Node((-1, -1), turn, None)
+    def __init__(self, init_state, turn: int, playout: str = "random", batch_size: int = 256, rave_k: float = 0,
+                 tt_size: int = 0, profile: bool = False, board: str = "array", prune: bool = False):
+        """
+        :param init_state: 初始棋盘状态, 二维数组或棋盘快照
+        :param turn: 当前下棋方
+        :param playout: 模拟方式, random 为逐步落子并判断胜负, fill 为一次性填满棋盘再判断胜负,
+                        bridge 为填满棋盘时应对对手对桥和边模板的侵入, numpy 为每个叶子结点用 NumPy 批量模拟 batch_size 局
+        :param batch_size: numpy 模拟方式下每个叶子结点模拟的局数
+        :param rave_k: RAVE 的等价参数 k, 结点访问 k 次时 uct 与 RAVE 的权重相近, 为 0 时不使用 RAVE,
+                       numpy 模拟方式没有单局的落子记录, 不支持 RAVE
+        :param tt_size: 置换表最多保存的局面数量, 为 0 时不使用置换表
+        :param profile: 是否记录每个阶段的耗时, 结果保存在 self.profile 中, 关闭时没有额外开销
+        :param board: 棋盘状态的实现, array 为一维数组加并查集, bitboard 为位棋盘
+        :param prune: 展开结点时是否剪掉死子、被吃的位置和被支配的落子, 减少子节点数量
+        """
+        if isinstance(init_state, Snapshot):  # 棋盘快照直接复制一维数组, 不经过二维数组
+            self.root_state = board_class(board).from_cells(init_state.cells(), init_state.size, turn)
+        else:
+            self.root_state = board_class(board)(init_state, turn)
+        self.pool = NodePool(self.root_state.size)  # 全部结点
+        self.root = self.pool.new_node(-1, turn, -1)  # 根结点下标
+        # 置换表, 不同落子顺序到达的相同局面共享统计信息
+        self.tt = TranspositionTable(tt_size) if tt_size else None
+        self.pool.hash[self.root] = self.root_state.hash
+
+        # 可选的模拟方式, 胜负分布相同, 用于对比每秒模拟次数
+        self.playouts = {"random": self.random_playout, "fill": self.fill_playout}
+        self.batch_playout = None  # 批量模拟器, 一次模拟多局, 反向传播时一次更新全部胜负次数
+        if playout == "numpy":
+            from hexcore.BatchPlayout import BatchPlayout
+            self.batch_playout = BatchPlayout(batch_size)
+        elif playout == "bridge":
+            from hexcore.Patterns import bridge_playout
+            self.playouts["bridge"] = bridge_playout
+        elif playout not in self.playouts:
+            raise ValueError(f"unknown playout: {playout}")
+        self.playout = playout
+        self.rave_k = rave_k if not self.batch_playout else 0
+        self.prune_moves = None  # 展开结点时去掉劣势位置的函数, 为 None 时使用全部空白位置
+        if prune:
+            from hexcore.Inferior import prune_moves
+            self.prune_moves = prune_moves
 
         # 一些统计信息
         self.run_time = 0
         self.simulate_times = 0
+        self.stopped_early = False  # 上一次搜索是否因为最佳落子已经确定而提前结束
+        self.extended = False  # 上一次搜索是否因为最佳落子不稳定而延长了时间
+        self.profile = SearchProfile() if profile else None
+        if profile:
+            self.expand = self.profiled_expand  # 只有打开 profile 时才替换为记录耗时的版本
 
-    def search(self, time_limit: int = 1) -> None:
-        """在限定的时间内对树进行展开和模拟"""
-        start_time = process_time()
-        simulate_times = 0
+    @property
+    def root_node(self) -> Node:
+        """根结点的视图, 用于查看搜索结果"""
+        return Node(self.pool, self.root)
 
-        while process_time() - start_time < time_limit:
+    def search(self, time_limit: float = 1, deadline: float = None, early_stop: bool = False,
+               extend: float = 0, cancelled: Callable[[], bool] = None) -> None:
+        """
+        在限定的时间内对树进行展开和模拟, 使用墙上时间计时
+        :param time_limit: 搜索时间上限/秒
+        :param deadline: 绝对的截止时间, 与 time.time() 比较, 用于多进程或整局的时间控制
+        :param early_stop: 最佳落子在剩余时间内已经不可能改变时提前结束
+        :param extend: 时间用完时最佳落子还不稳定, 最多延长的搜索时间/秒
+        :param cancelled: 返回 True 时尽快结束搜索, 用于在界面上中止 AI 的思考
+        """
+        if self.profile is not None:
+            return self.search_profiled(time_limit, deadline, early_stop, extend, cancelled)
+        timer = SearchTimer(self, time_limit, deadline, early_stop, extend, cancelled)
+        iterations, simulate_times = 0, 0
+
+        while timer.running(iterations, simulate_times):
+            iterations += 1
             node, state = self.select()
-            winner = self.simulate(state)
-            self.back_propagate(node, winner)
-            simulate_times += 1
+            if self.batch_playout:
+                red_wins = self.batch_playout.simulate(state)
+                self.back_propagate_batch(node, red_wins, self.batch_playout.batch_size)
+                simulate_times += self.batch_playout.batch_size
+            else:
+                winner = self.simulate(state)
+                self.back_propagate(node, winner)
+                if self.rave_k:
+                    self.back_propagate_amaf(node, winner, state.cells)
+                simulate_times += 1
 
         # 记录统计信息
-        self.run_time = process_time() - start_time
+        self.run_time = timer.elapsed
         self.simulate_times = simulate_times
+        self.stopped_early, self.extended = timer.stopped_early, timer.extended
 
-    def select(self) -> Tuple[Node, BoardState]:
-        """选择一个结点, 用于下一步模拟操作"""
+    def search_profiled(self, time_limit: float = 1, deadline: float = None, early_stop: bool = False,
+                        extend: float = 0, cancelled: Callable[[], bool] = None) -> None:
+        """与 search 相同, 额外记录每个阶段的耗时、树的深度、模拟的步数, 每次搜索前清空上一次的记录"""
+        profile = self.profile
+        profile.reset()
+        parent = self.pool.parent
+        timer = SearchTimer(self, time_limit, deadline, early_stop, extend, cancelled)
+        simulate_times = 0
+
+        while timer.running(profile.iterations, simulate_times):
+            t0 = perf_counter()
+            state = self.root_state.copy()
+            t1 = perf_counter()
+            expand_time = profile.time["expand"]
+            node = self.descend(state)
+            t2 = perf_counter()
+            profile.add("copy", t1 - t0)
+            profile.add("select", t2 - t1 - (profile.time["expand"] - expand_time))
+
+            depth, ancestor = 0, parent[node]
+            while ancestor >= 0:
+                depth, ancestor = depth + 1, parent[ancestor]
+            profile.iterations += 1
+            profile.depth_total += depth
+            profile.rollout_total += len(state.empty_indices())
+
+            if self.batch_playout:
+                red_wins = self.batch_playout.simulate(state)
+                t3 = perf_counter()
+                self.back_propagate_batch(node, red_wins, self.batch_playout.batch_size)
+                simulate_times += self.batch_playout.batch_size
+            else:
+                winner = self.simulate(state)
+                t3 = perf_counter()
+                self.back_propagate(node, winner)
+                if self.rave_k:
+                    self.back_propagate_amaf(node, winner, state.cells)
+                simulate_times += 1
+            t4 = perf_counter()
+            profile.add("simulate", t3 - t2)
+            profile.add("back_propagate", t4 - t3)
+
+        self.run_time = timer.elapsed
+        self.simulate_times = simulate_times
+        self.stopped_early, self.extended = timer.stopped_early, timer.extended
+
+    def move_root(self, moves: List[Pos]) -> bool:
+        """
+        沿着给定的落子序列把根结点移动到对应的子孙结点, 保留该子树的统计信息, 用于在两次搜索之间复用搜索树
+        子树会被复制到新的结点池中, 其它分支占用的空间随旧结点池一起释放
+        :param moves: 从当前根结点开始的落子序列
+        :return: 对应的子树不存在时返回 False, 此时树不会被修改
+        """
+        pool, size = self.pool, self.root_state.size
         node = self.root
+        for row, col in moves:
+            index = row * size + col
+            for child in pool.children(node):
+                if pool.move[child] == index:
+                    node = child
+                    break
+            else:
+                return False
+
+        for move in moves:
+            self.root_state.set_piece(move)
+        self.pool = pool.extract(node)
+        self.root = 0
+        return True
+
+    def select(self) -> Tuple[int, BoardState]:
+        """选择一个结点, 用于下一步模拟操作"""
         # 每次选择只复制一次棋盘状态, 每经过一个子节点, 修改一次棋盘状态副本
-        state_copy = BoardState(self.root_state.state, self.root_state.turn)
+        state_copy = self.root_state.copy()
+        return self.descend(state_copy), state_copy
 
-        while node.children:  # 如果没达到叶子节点, 一直深入下去
-            max_value = max(node.children, key=lambda ch: ch.value).value  # 子节点中 value 最大值
-            max_nodes = [n for n in node.children if n.value == max_value]  # value 最大的子节点
-            node = choice(max_nodes)  # 随便选一个
-            state_copy.set_piece(node.move)
+    def descend(self, state_copy: BoardState) -> int:
+        """从根结点向下选择到叶子结点, 必要时展开, 同时在棋盘状态副本上落子"""
+        node = self.root
+        move, visits, child_count = self.pool.move, self.pool.visits, self.pool.child_count
+
+        while child_count[node]:  # 如果没达到叶子节点, 一直深入下去
+            node = self.select_child(node)
+            state_copy.play(move[node])
 
             # 如果子节点还没有被探索, 直接选择它
-            if node.visits == 0:
-                return node, state_copy
+            if visits[node] == 0:
+                return node
 
         # 如果达到叶子结点, 就进行扩展, 随机返回一个子节点
         if self.expand(node, state_copy):
-            node = choice(node.children)
-            state_copy.set_piece(node.move)
+            node = choice(self.pool.children(node))
+            state_copy.play(move[node])
+
+        return node
 
-        return node, state_copy
+    def select_child(self, node: int) -> int:
+        """根据 uct 算法选出 value 最大的子节点, 有多个时随便选一个"""
+        if self.rave_k:
+            return self.select_child_rave(node)
+        visits, reward, tt = self.pool.visits, self.pool.reward, self.tt
+        log_visits = log(visits[node])
+        best_value, best_nodes = -1.0, []
+        for child in self.pool.children(node):
+            n, w = visits[child], reward[child]
+            if tt is not None:  # 使用置换表中该局面的统计信息
+                n, w = tt.get(self.pool.hash[child], n) or (n, w)
+            if n == 0:
+                value = float('inf')
+            else:  # exploitation + exploration
+                value = w / n + 0.5 * sqrt(2 * log_visits / n)
+            if value > best_value:
+                best_value, best_nodes = value, [child]
+            elif value == best_value:
+                best_nodes.append(child)
+        return choice(best_nodes)
 
-    def expand(self, parent: Node, state: BoardState):
+    def select_child_rave(self, node: int) -> int:
+        """
+        使用 uct 与 RAVE 的加权值选择子节点
+        RAVE 的权重 beta = sqrt(k / (3n + k)), 结点访问次数 n 越多, 越依赖结点自身的胜率
+        没有访问过的结点直接使用 RAVE 的胜率, 不再要求每个子节点都先被访问一次
+        """
+        pool, k, tt = self.pool, self.rave_k, self.tt
+        visits, reward, amaf_visits, amaf_reward = pool.visits, pool.reward, pool.amaf_visits, pool.amaf_reward
+        log_visits = log(visits[node])
+        best_value, best_nodes = -1.0, []
+        for child in pool.children(node):
+            n, w, amaf_n = visits[child], reward[child], amaf_visits[child]
+            if tt is not None:  # 使用置换表中该局面的统计信息
+                n, w = tt.get(pool.hash[child], n) or (n, w)
+            if n == 0 and amaf_n == 0:
+                value = float('inf')
+            elif n == 0:
+                value = amaf_reward[child] / amaf_n + 0.5 * sqrt(2 * log_visits)
+            else:
+                beta = sqrt(k / (3 * n + k))
+                q = w / n
+                if amaf_n:
+                    q = (1 - beta) * q + beta * amaf_reward[child] / amaf_n
+                value = q + 0.5 * sqrt(2 * log_visits / n)
+            if value > best_value:
+                best_value, best_nodes = value, [child]
+            elif value == best_value:
+                best_nodes.append(child)
+        return choice(best_nodes)
+
+    def expand(self, parent: int, state: BoardState):
         # 如果游戏在该节点处已经结束, 无需扩展
         if state.get_winner() != NoneTeam:
             return False
 
-        for move in state.get_moves():  # 棋盘中空白位置都可以是子节点
-            parent.children.append(Node(move, state.turn, parent))
-
+        # 棋盘中空白位置都可以是子节点, 打开 prune 时去掉劣势位置
+        moves = self.prune_moves(state) if self.prune_moves else state.empty_indices()
+        first = self.pool.add_children(parent, moves, state.turn)
+        if self.tt is not None:  # 增量计算子节点局面的哈希值
+            red_keys, blue_keys, turn_key = state.zobrist
+            keys = red_keys if state.turn == RedTeam else blue_keys
+            for child, index in enumerate(moves, first):
+                self.pool.hash[child] = state.hash ^ keys[index] ^ turn_key
         return True
 
+    def profiled_expand(self, parent: int, state: BoardState):
+        """记录耗时和子节点数量的 expand"""
+        start = perf_counter()
+        expanded = type(self).expand(self, parent, state)
+        self.profile.add("expand", perf_counter() - start)
+        if expanded:
+            self.profile.expansions += 1
+            self.profile.children_total += self.pool.child_count[parent]
+        return expanded
+
     def simulate(self, state: BoardState) -> int:
         """在给定的状态下, 模拟一局对战, 返回胜利者"""
+        return self.playouts[self.playout](state)
+
+    @staticmethod
+    def random_playout(state: BoardState) -> int:
+        """每次随机落一子, 并用并查集判断是否已经分出胜负"""
         moves = state.get_moves()
         while True:
             winner = state.get_winner()
@@ -354,35 +1068,87 @@ class MCTS:
             state.set_piece(move)
             moves.remove(move)
 
-    def back_propagate(self, node: Node, winner: int):
+    @staticmethod
+    def fill_playout(state: BoardState) -> int:
+        """
+        将空白位置打乱后双方轮流填满棋盘, 最后只判断一次胜负
+        Hex 棋盘下满后必定有且只有一方获胜, 继续落子不会改变已经出现的胜者,
+        所以结果分布与逐步随机落子相同, 但省去了每一步的并查集更新和胜负判断
+        注意: 填满后 state 的并查集不再与棋盘一致, state 只应作为一次性的副本使用
+        """
+        winner = state.get_winner()
+        if winner != NoneTeam:  # 选择阶段已经分出胜负
+            return winner
+        empty = state.empty_indices()
+        shuffle(empty)
+        state.fill(empty)  # 当前下棋方先落子
+        return state.get_full_board_winner()
+
+    def back_propagate(self, node: int, winner: int):
         """从给定结点反向传播, 更新其父节点信息"""
-        while node is not None:
-            reward = 1 if winner == node.team else 0
-            node.visits += 1
-            node.reward += reward
-            node = node.parent
+        team, parent, visits, reward = self.pool.team, self.pool.parent, self.pool.visits, self.pool.reward
+        while node >= 0:
+            visits[node] += 1
+            if winner == team[node]:
+                reward[node] += 1
+            if self.tt is not None:
+                self.tt.update(self.pool.hash[node], 1, winner == team[node])
+            node = parent[node]
+
+    def back_propagate_amaf(self, node: int, winner: int, cells: array):
+        """
+        RAVE 反向传播, 把模拟中下出的所有棋子都当作是在路径上每个结点处先下的一步
+        路径上每个结点的子节点中, 如果它的落子位置最终属于同一方, 就更新该子节点的 amaf 统计
+        :param node: 开始反向传播的结点
+        :param winner: 模拟的胜者
+        :param cells: 模拟结束时的棋盘
+        """
+        pool = self.pool
+        move, team, parent = pool.move, pool.team, pool.parent
+        amaf_visits, amaf_reward = pool.amaf_visits, pool.amaf_reward
+        while node >= 0:
+            for child in pool.children(node):
+                child_team = team[child]
+                if cells[move[child]] == child_team:
+                    amaf_visits[child] += 1
+                    if winner == child_team:
+                        amaf_reward[child] += 1
+            node = parent[node]
+
+    def back_propagate_batch(self, node: int, red_wins: int, count: int):
+        """
+        批量模拟后的反向传播, 一次性更新 count 局模拟的结果
+        :param node: 开始反向传播的结点
+        :param red_wins: 红方获胜的局数
+        :param count: 模拟的总局数
+        """
+        team, parent, visits, reward = self.pool.team, self.pool.parent, self.pool.visits, self.pool.reward
+        blue_wins = count - red_wins
+        while node >= 0:
+            wins = red_wins if team[node] == RedTeam else blue_wins
+            visits[node] += count
+            reward[node] += wins
+            if self.tt is not None:
+                self.tt.update(self.pool.hash[node], count, wins)
+            node = parent[node]
 
     def best_move(self) -> Pos:
         """获取最佳下棋位置"""
-        max_reward = max(ch.reward for ch in self.root.children)  # 最大的 reward 值
-        max_reward_chs = [ch for ch in self.root.children if ch.reward == max_reward]  # reward 值最大的结点
-        best_choice = max(max_reward_chs, key=lambda ch: ch.visits)  # 如果有 reward 相同的, 选 visits 最大的
-        return best_choice.move
+        visits, reward = self.pool.visits, self.pool.reward
+        children = self.pool.children(self.root)
+        max_reward = max(reward[ch] for ch in children)  # 最大的 reward 值
+        max_reward_chs = [ch for ch in children if reward[ch] == max_reward]  # reward 值最大的结点
+        best_choice = max(max_reward_chs, key=lambda ch: visits[ch])  # 如果有 reward 相同的, 选 visits 最大的
+        return divmod(self.pool.move[best_choice], self.root_state.size)
 
     @property
     def tree_node_num(self) -> int:
-        """统计树的结点数量"""
-        queue = Queue()
-        count = 0
-        queue.put(self.root)
-        while not queue.empty():
-            node = queue.get()
-            count += 1
-            for child in node.children:
-                queue.put(child)
-        return count
+        """统计树的结点数量, 结点池中只保存当前根结点的子树"""
+        return self.pool.count
 
     @property
-    def statistics(self) -> tuple:
+    def statistics(self) -> Statistics:
         """本次搜索的开销信息"""
-        return self.simulate_times, self.tree_node_num, self.run_time
+        if self.tt is None:
+            return Statistics(self.simulate_times, self.tree_node_num, self.run_time)
+        return Statistics(self.simulate_times, self.tree_node_num, self.run_time, self.tt.hit_rate, self.tt.nbytes)
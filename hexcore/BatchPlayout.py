@@ -0,0 +1,78 @@
+from typing import List, Union
+
+from hexcore.Algorithms import BoardState, RedTeam, BlueTeam, NoneTeam
+
+try:
+    import numpy as np
+except ImportError:  # numpy 是可选依赖, 只有使用批量模拟时才需要
+    np = None
+
+
+class BatchPlayout:
+    """
+    基于 NumPy 的批量模拟
+    对每个叶子结点一次生成 K 个随机填满的棋盘 (K, size, size), 再用向量化的洪水填充同时判断 K 个胜者
+    填满的 Hex 棋盘有且只有一方获胜, 所以只需要判断红方是否联通上下边界
+    """
+
+    def __init__(self, batch_size: int = 256, seed: int = None):
+        if np is None:
+            raise ImportError("BatchPlayout requires numpy, run: pip install numpy")
+        self.batch_size = batch_size  # 每个叶子结点模拟的局数 K
+        self.rng = np.random.default_rng(seed)
+
+    def fill(self, state: BoardState) -> 'np.ndarray':
+        """
+        在给定状态下生成 K 个随机下满的棋盘, 空白位置打乱后由双方从当前下棋方开始轮流填满
+        只读取 state.cells 的一维数组, 两种棋盘状态都可以使用
+        :return: (K, size, size) 的 int8 数组
+        """
+        size, k = state.size, self.batch_size
+        cells = np.frombuffer(state.cells, dtype=np.int8)
+        empty = np.flatnonzero(cells == NoneTeam)  # 空白位置的下标
+        boards = np.tile(cells, (k, 1))
+        if empty.size:
+            order = empty[np.argsort(self.rng.random((k, empty.size)), axis=1)]  # 每一局的落子顺序
+            rows = np.arange(k)[:, None]
+            boards[rows, order[:, 0::2]] = state.turn  # 当前下棋方先落子
+            boards[rows, order[:, 1::2]] = -state.turn
+        return boards.reshape(k, size, size)
+
+    @staticmethod
+    def winners(boards: 'np.ndarray') -> 'np.ndarray':
+        """
+        同时判断一批下满棋盘的获胜者
+        从第一行的红子开始, 每轮把联通区域向六个方向扩展一格, 直到不再变化
+        :param boards: (K, size, size) 的下满棋盘
+        :return: (K,) 的获胜队伍数组
+        """
+        red = boards == RedTeam
+        reach = np.zeros_like(red)
+        reach[:, 0, :] = red[:, 0, :]  # 红方上边界
+        while True:
+            grown = reach.copy()
+            # 六个方向: (r-1, c), (r+1, c), (r, c-1), (r, c+1), (r-1, c+1), (r+1, c-1)
+            grown[:, 1:, :] |= reach[:, :-1, :]
+            grown[:, :-1, :] |= reach[:, 1:, :]
+            grown[:, :, 1:] |= reach[:, :, :-1]
+            grown[:, :, :-1] |= reach[:, :, 1:]
+            grown[:, 1:, :-1] |= reach[:, :-1, 1:]
+            grown[:, :-1, 1:] |= reach[:, 1:, :-1]
+            grown &= red
+            if np.array_equal(grown, reach):
+                break
+            reach = grown
+        red_win = reach[:, -1, :].any(axis=1)  # 是否到达红方下边界
+        return np.where(red_win, RedTeam, BlueTeam).astype(np.int8)
+
+    def simulate(self, states: Union[BoardState, List[BoardState]]) -> Union[int, List[int]]:
+        """
+        对一个或一批叶子结点各模拟 K 局
+        :param states: 叶子结点对应的棋盘状态 (BoardState 或 BitBoardState), 或者它们的列表
+        :return: 每个状态下红方获胜的局数, 传入单个状态时返回单个整数
+        """
+        if not isinstance(states, (list, tuple)):  # BitBoardState 不是 BoardState 的子类, 按容器类型判断
+            return self.simulate([states])[0]
+        boards = np.concatenate([self.fill(state) for state in states])
+        red_win = self.winners(boards) == RedTeam
+        return [int(n) for n in red_win.reshape(len(states), self.batch_size).sum(axis=1)]
@@ -0,0 +1,205 @@
+"""
+位棋盘
+红蓝双方各用一个 Python 大整数保存棋子, 位置 (row, col) 对应第 row * (size + 1) + col 位,
+每行末尾多出一位空列作为隔离, 六个方向的邻居都只需要一次移位, 移出棋盘的位会落在空列上被掩码清除
+
+连通性使用按位的洪水填充: 从边界上的棋子出发, 每一轮把集合向六个方向各移动一位, 再与己方棋子相与,
+一轮整数运算就扩展整个棋盘, 不需要逐个格子遍历
+"""
+from array import array
+from functools import lru_cache
+from typing import List, Tuple, NamedTuple
+
+from hexcore.Algorithms import zobrist_table, Pos, State, RedTeam, BlueTeam, NoneTeam
+
+
+class BitMasks(NamedTuple):
+    """某种棋盘大小的掩码, 每种大小只计算一次"""
+    width: int  # 每行占用的位数, size + 1
+    board: int  # 棋盘上所有位置
+    top: int  # 第一行, 红方上边界
+    bottom: int  # 最后一行, 红方下边界
+    left: int  # 第一列, 蓝方左边界
+    right: int  # 最后一列, 蓝方右边界
+    bits: Tuple[int, ...]  # 一维棋盘下标 row * size + col 对应的位
+
+
+@lru_cache(maxsize=None)
+def bit_masks(size: int) -> BitMasks:
+    """计算棋盘大小对应的掩码"""
+    width = size + 1
+    bits = tuple(1 << (row * width + col) for row in range(size) for col in range(size))
+    top = sum(bits[:size])
+    bottom = sum(bits[size * (size - 1):])
+    left = sum(bits[row * size] for row in range(size))
+    right = sum(bits[row * size + size - 1] for row in range(size))
+    return BitMasks(width, sum(bits), top, bottom, left, right, bits)
+
+
+def flood(seed: int, stones: int, target: int, width: int) -> bool:
+    """
+    按位洪水填充, 判断从 seed 出发能否经过 stones 中的棋子到达 target
+    :param seed: 出发的棋子集合, 必须是 stones 的子集
+    :param stones: 可以经过的棋子
+    :param target: 目标位置
+    :param width: 每行占用的位数
+    """
+    diagonal = width - 1
+    reached = seed
+    while reached:
+        if reached & target:
+            return True
+        grown = (reached | reached << 1 | reached >> 1 | reached << width | reached >> width
+                 | reached << diagonal | reached >> diagonal) & stones
+        if grown == reached:
+            return False
+        reached = grown
+    return False
+
+
+class BitBoardState:
+    """
+    使用位棋盘的棋盘状态, 与 BoardState 的接口相同, 可以直接用于 MCTS 和 Judge
+    复制只需要复制两个整数, 判断胜负是几轮整数运算, 不需要维护并查集
+    """
+
+    def __init__(self, state: State, turn: int):
+        self.size = len(state)  # 棋盘大小
+        self.masks = bit_masks(self.size)
+        self.zobrist = zobrist_table(self.size)  # Zobrist 哈希使用的随机数表
+        self.turn = turn  # 当前下棋方
+        bits = self.masks.bits
+        cells = [team for row in state for team in row]
+        self.red = sum(bits[index] for index, team in enumerate(cells) if team == RedTeam)  # 红方棋子
+        self.blue = sum(bits[index] for index, team in enumerate(cells) if team == BlueTeam)  # 蓝方棋子
+        self.hash = self.compute_hash()  # 棋盘的 Zobrist 哈希值, 落子时增量更新
+
+    @classmethod
+    def from_cells(cls, cells: array, size: int, turn: int) -> 'BitBoardState':
+        """使用一维棋盘数组创建棋盘状态"""
+        board_state = cls.__new__(cls)
+        board_state.size = size
+        board_state.masks = bit_masks(size)
+        board_state.zobrist = zobrist_table(size)
+        board_state.turn = turn
+        bits = board_state.masks.bits
+        board_state.red = sum(bits[index] for index, team in enumerate(cells) if team == RedTeam)
+        board_state.blue = sum(bits[index] for index, team in enumerate(cells) if team == BlueTeam)
+        board_state.hash = board_state.compute_hash()
+        return board_state
+
+    def copy(self) -> 'BitBoardState':
+        """复制棋盘状态, 整数不可变, 直接共享即可"""
+        board_state = BitBoardState.__new__(BitBoardState)
+        board_state.size = self.size
+        board_state.masks = self.masks
+        board_state.zobrist = self.zobrist
+        board_state.turn = self.turn
+        board_state.red = self.red
+        board_state.blue = self.blue
+        board_state.hash = self.hash
+        return board_state
+
+    @property
+    def cells(self) -> array:
+        """转换为一维棋盘数组, 每次调用都会重新生成, 只用于 RAVE 等需要逐格读取的场合"""
+        bits, red, blue = self.masks.bits, self.red, self.blue
+        return array('b', [RedTeam if red & bit else BlueTeam if blue & bit else NoneTeam for bit in bits])
+
+    def compute_hash(self) -> int:
+        """根据棋盘和下棋方计算 Zobrist 哈希值"""
+        red_keys, blue_keys, turn_key = self.zobrist
+        value = turn_key if self.turn == BlueTeam else 0
+        for index, team in enumerate(self.cells):
+            if team == RedTeam:
+                value ^= red_keys[index]
+            elif team == BlueTeam:
+                value ^= blue_keys[index]
+        return value
+
+    def canonical_hash(self) -> Tuple[int, bool]:
+        """
+        棋盘旋转 180 度之后与原棋盘等价, 取两者哈希值中较小的一个作为标准哈希值
+        :return: 标准哈希值, 是否使用了旋转后的棋盘
+        """
+        red_keys, blue_keys, turn_key = self.zobrist
+        cells = self.cells
+        last = len(cells) - 1
+        rotated = turn_key if self.turn == BlueTeam else 0
+        for index, team in enumerate(cells):
+            if team == RedTeam:
+                rotated ^= red_keys[last - index]
+            elif team == BlueTeam:
+                rotated ^= blue_keys[last - index]
+        return (rotated, True) if rotated < self.hash else (self.hash, False)
+
+    def get_winner(self) -> int:
+        """从边界出发做洪水填充判断获胜者"""
+        masks, red, blue = self.masks, self.red, self.blue
+        if red & masks.bottom and flood(red & masks.top, red, masks.bottom, masks.width):
+            return RedTeam
+        if blue & masks.right and flood(blue & masks.left, blue, masks.right, masks.width):
+            return BlueTeam
+        return NoneTeam
+
+    def get_full_board_winner(self) -> int:
+        """棋盘下满之后判断获胜者, 有且只有一方获胜, 只需要检查红方"""
+        masks, red = self.masks, self.red
+        return RedTeam if flood(red & masks.top, red, masks.bottom, masks.width) else BlueTeam
+
+    def empty_indices(self) -> List[int]:
+        """空白位置的一维棋盘下标"""
+        width = self.masks.width
+        empty = self.masks.board & ~(self.red | self.blue)
+        indices = []
+        while empty:  # 每次取出最低位的空白位置
+            low = empty & -empty
+            empty ^= low
+            position = low.bit_length() - 1
+            indices.append(position - position // width)  # 去掉每行末尾的空列
+        return indices
+
+    def fill(self, order: List[int]):
+        """按顺序双方轮流落子, 当前下棋方先落子, 不更新哈希值和下棋方, 用于一次性填满棋盘"""
+        bits = self.masks.bits
+        own = sum(bits[index] for index in order[0::2])
+        other = sum(bits[index] for index in order[1::2])
+        if self.turn == RedTeam:
+            self.red, self.blue = self.red | own, self.blue | other
+        else:
+            self.red, self.blue = self.red | other, self.blue | own
+
+    def change_turn(self):
+        """交换下棋方"""
+        if self.turn == RedTeam:
+            self.turn = BlueTeam
+        elif self.turn == BlueTeam:
+            self.turn = RedTeam
+
+    def set_piece(self, move: Pos):
+        """下一步棋, 修改棋盘的状态"""
+        row, col = move
+        self.play(row * self.size + col)
+
+    def play(self, index: int):
+        """在一维棋盘的下标处下一步棋"""
+        red_keys, blue_keys, turn_key = self.zobrist
+        if self.turn == RedTeam:
+            self.hash ^= red_keys[index] ^ turn_key
+            self.red |= self.masks.bits[index]
+        elif self.turn == BlueTeam:
+            self.hash ^= blue_keys[index] ^ turn_key
+            self.blue |= self.masks.bits[index]
+        self.change_turn()
+
+    def get_moves(self) -> List[Pos]:
+        """获取可以下棋的位置"""
+        size = self.size
+        return [divmod(index, size) for index in self.empty_indices()]
+
+    def print(self):
+        cells = self.cells
+        for row in range(self.size):
+            for col in range(self.size):
+                print(cells[row * self.size + col], end='\t')
+            print()
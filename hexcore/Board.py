@@ -1,5 +1,6 @@
+from array import array
 from enum import Enum
-from typing import List, Iterable
+from typing import List, Iterable, Iterator, NamedTuple
 
 
 class Team(Enum):
@@ -24,36 +25,94 @@ class Piece:
         return f"{self.row, self.col, self.team}"
 
 
+TEAMS = {team.value: team for team in Team}  # 队伍的值到 Team 的映射, 比 Team(value) 快
+
+
+class Snapshot(NamedTuple):
+    """棋盘的只读快照, 同一个版本的棋盘只生成一次"""
+    version: int  # 生成快照时棋盘的版本号
+    size: int  # 棋盘大小
+    data: bytes  # 一维棋盘, 位置 (row, col) 对应下标 row * size + col, 每个位置一个有符号字节
+
+    def cells(self) -> array:
+        """复制为可以修改的一维棋盘数组"""
+        cells = array('b')
+        cells.frombytes(self.data)
+        return cells
+
+    def state(self) -> List[List[int]]:
+        """转换为二维数组"""
+        cells, size = self.cells(), self.size
+        return [cells[row * size:(row + 1) * size].tolist() for row in range(size)]
+
+
+class BoardRow:
+    """棋盘一行的视图, 支持 board[row][col], 访问时才根据棋盘数据生成棋子对象"""
+
+    def __init__(self, board: 'Board', row: int):
+        self.board = board
+        self.row = row
+
+    def __getitem__(self, col: int) -> Piece:
+        if not 0 <= col < self.board.size:
+            raise IndexError(col)
+        return Piece(self.row, col, TEAMS[self.board.cells[self.row * self.board.size + col]])
+
+    def __len__(self):
+        return self.board.size
+
+    def __iter__(self) -> Iterator[Piece]:
+        return (self[col] for col in range(self.board.size))
+
+
 class Board:
-    """棋盘"""
+    """
+    棋盘
+    棋盘数据保存在一维的有符号字节数组中, 每次落子版本号加一
+    AI 和裁判通过 snapshot 获取只读快照, 同一个版本只复制一次, 或者通过 moves 增量读取新增的落子,
+    界面仍然可以使用 board[row][col] 和 items() 按棋子对象访问
+    """
 
     def __init__(self, board_size: int):
         # 初始化空棋盘 board_size x board_size
         self.size = board_size
-        self.board = None
+        self.cells = array('b', bytes(board_size * board_size))  # 一维棋盘, 保存每个位置的队伍值
+        self.moves: List[Piece] = []  # 按顺序记录的落子, 裁判据此增量更新连通状态
+        self.version = 0  # 棋盘的版本号, 每次落子或清空都会增加
+        self.cached_snapshot: Snapshot = None  # 最近一次生成的快照
         self.reset()
 
     def reset(self):
         """清空棋盘"""
-        self.board = [[Piece(row, col) for col in range(self.size)] for row in range(self.size)]
+        self.cells = array('b', bytes(self.size * self.size))
+        self.moves = []
+        self.version += 1
 
-    def __iter__(self):
+    def __iter__(self) -> Iterator[BoardRow]:
         """支持迭代棋盘对象"""
-        return iter(self.board)
+        return (BoardRow(self, row) for row in range(self.size))
 
-    def __getitem__(self, item) -> List[Piece]:
+    def __getitem__(self, item) -> BoardRow:
         """支持 operator[]"""
-        return self.board[item]
+        if not 0 <= item < self.size:
+            raise IndexError(item)
+        return BoardRow(self, item)
 
     def items(self) -> Iterable[Piece]:
         """获取全部棋子数组, 一次性遍历整个二维数组, 返回一个生成器"""
-        for row in self.board:
-            for piece in row:
-                yield piece
+        size = self.size
+        for index, team in enumerate(self.cells):
+            yield Piece(index // size, index % size, TEAMS[team])
+
+    def snapshot(self) -> Snapshot:
+        """获取棋盘的只读快照, 棋盘没有变化时返回同一个快照, 不会重新复制"""
+        if self.cached_snapshot is None or self.cached_snapshot.version != self.version:
+            self.cached_snapshot = Snapshot(self.version, self.size, self.cells.tobytes())
+        return self.cached_snapshot
 
     def state(self):
         """获取棋盘状态, 返回二维数组"""
-        return [[p.team.value for p in row] for row in self]
+        return self.snapshot().state()
 
     def set_piece(self, piece: Piece) -> bool:
         """落子, 成功返回 True, 失败返回 False"""
@@ -62,7 +121,10 @@ class Board:
             return False
         if col >= self.size or col < 0:
             return False
-        if self[row][col].team != Team.NONE:
+        index = row * self.size + col
+        if self.cells[index] != Team.NONE.value:
             return False  # 这个位置有棋子了
-        self[row][col] = piece
+        self.cells[index] = piece.team.value
+        self.moves.append(piece)
+        self.version += 1
         return True
@@ -0,0 +1,196 @@
+"""
+在常驻子进程中运行的 AI
+子进程里保存一份镜像棋盘和一个普通的 AI 玩家, 界面进程每一步只发送新增的落子, 搜索结果以 Future 的形式返回
+搜索独占子进程的 CPU, 不和界面的事件循环竞争 GIL; 重新开始对局时可以中止正在进行的搜索
+"""
+import multiprocessing
+import signal
+import weakref
+from concurrent.futures import Future
+from multiprocessing.connection import Connection
+from threading import Thread, Lock
+from typing import List, Tuple
+
+from gameui.Config import Config
+from hexcore.Algorithms import Pos
+from hexcore.Board import Board, Team, Piece
+from hexcore.Player import Player, AI
+
+
+def engine_worker(conn: Connection, cancelled_id, team: Team, size: int, options: dict):
+    """
+    AI 子进程, 循环接收命令:
+        ("play", (request_id, moves)): 把 (row, col, team) 形式的新增落子同步到镜像棋盘, 然后搜索,
+                                       返回 (request_id, "move", (row, col)), 搜索被中止时返回 (request_id, "cancelled", None),
+                                       出错时返回 (request_id, "error", 异常)
+        ("reset", None): 清空镜像棋盘, 通知 AI 对局结束
+        ("quit", None): 退出进程
+    :param cancelled_id: 共享内存中的整数, 编号不超过它的搜索都已经被中止
+    界面进程关闭管道或者已经退出时, 正在进行的搜索会被中止, 子进程随之退出
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C 只由界面进程处理, 再通过管道结束子进程
+    board = Board(size)
+    ai = AI(team, **options)
+    ai.set_board(board)
+    request_id = 0
+    parent = multiprocessing.parent_process()
+    ai.cancelled = lambda: request_id <= cancelled_id.value or not parent.is_alive()
+    while True:
+        try:
+            command, payload = conn.recv()
+        except (EOFError, OSError):  # 界面进程已经关闭管道或退出
+            command, payload = "quit", None
+        if command == "quit":
+            ai.close()
+            return
+        if command == "reset":
+            board.reset()
+            ai.game_over()
+            continue
+
+        request_id, moves = payload
+        for row, col, value in moves:  # 已经在镜像棋盘上的落子 (AI 自己的落子) 会落子失败, 直接跳过
+            board.set_piece(Piece(row, col, Team(value)))
+        reply = (request_id, "cancelled", None)
+        if not ai.cancelled():
+            count = len(board.moves)
+            try:
+                ai.let_me_play()
+            except Exception as e:
+                reply = (request_id, "error", e)
+            else:
+                if not ai.cancelled() and len(board.moves) > count:
+                    piece = board.moves[-1]
+                    reply = (request_id, "move", (piece.row, piece.col))
+        try:
+            conn.send(reply)
+        except OSError:  # 界面进程已经退出, 没有人接收结果
+            ai.close()
+            return
+
+
+def shutdown_engine(conn: Connection, process, cancelled_id, timeout: float = 5.0):
+    """
+    中止搜索并结束子进程, 子进程没有及时退出时强制结束
+    RemoteAI.close 和解释器退出时的终结器共用, 不能引用 RemoteAI 本身
+    """
+    cancelled_id.value = 1 << 62  # 中止所有编号的搜索
+    try:
+        conn.send(("quit", None))
+    except OSError:  # 子进程已经退出
+        pass
+    process.join(timeout)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+    conn.close()  # 子进程退出后接收线程会先读到 EOF, 这时再关闭管道
+
+
+class RemoteAI(Player):
+    """
+    在常驻子进程中思考的 AI 玩家, 配置与 AI 相同
+    界面通过 play 获取落子的 Future, 不会阻塞事件循环; let_me_play 会等待搜索结束, 可以直接用于 Game.start
+    """
+
+    def __init__(self, team: Team, **options):
+        """:param options: 引擎配置, 与 AI 相同"""
+        super(RemoteAI, self).__init__(team)
+        self.options = options
+        self.conn: Connection = None
+        self.process = None
+        self.cancelled_id = None  # 最后一次中止的搜索编号, 与子进程共享, 子进程每隔若干次迭代检查一次
+        self.reader: Thread = None  # 接收子进程结果的线程
+        self.future: Future = None  # 正在进行的搜索
+        self.request_id = 0  # 正在进行的搜索的编号, 用于丢弃已经取消的搜索迟到的结果
+        self.lock = Lock()  # 保护 future, 界面线程和接收线程都会访问
+        self.sent = 0  # 已经发送给子进程的落子数量
+        self.finalizer: weakref.finalize = None  # 没有调用 close 就退出解释器时结束子进程
+
+    def start_process(self):
+        """启动子进程, 第一次搜索时调用"""
+        # 使用 spawn 启动子进程, 避免在 UI 的多线程环境下 fork; 子进程内 AI 还可能启动后台思考进程, 所以不能是守护进程
+        context = multiprocessing.get_context("spawn")
+        # spawn 的子进程重新导入 Config, 看不到运行时的修改, 所以把当前的 ai_ 配置项一起发送过去
+        options = {name[3:]: getattr(Config, name) for name in vars(Config) if name.startswith("ai_")}
+        options.update(self.options)
+        self.conn, child_conn = context.Pipe()
+        self.cancelled_id = context.Value('q', 0, lock=False)
+        self.process = context.Process(target=engine_worker,
+                                       args=(child_conn, self.cancelled_id, self.team, self.board.size, options))
+        self.process.start()
+        child_conn.close()  # 子进程已经持有自己的一端
+        # 子进程不是守护进程, 退出时 multiprocessing 会等待它结束, 所以异常退出时也要通过终结器关闭管道
+        self.finalizer = weakref.finalize(self, shutdown_engine, self.conn, self.process, self.cancelled_id)
+        self.reader = Thread(target=self.receive, daemon=True)
+        self.reader.start()
+
+    def receive(self):
+        """接收线程, 把子进程返回的结果交给对应的 Future, 已经取消的搜索直接丢弃结果"""
+        while True:
+            try:
+                request_id, status, payload = self.conn.recv()
+            except (EOFError, OSError):
+                return
+            with self.lock:
+                if request_id != self.request_id:
+                    continue
+                future, self.future = self.future, None
+            if future is None or future.cancelled():
+                continue
+            if status == "move":
+                future.set_result(payload)
+            elif status == "error":
+                future.set_exception(payload)
+            else:
+                future.cancel()
+
+    def new_moves(self) -> List[Tuple[int, int, int]]:
+        """上一次发送之后棋盘上新增的落子"""
+        moves = self.board.moves
+        if len(moves) < self.sent:  # 棋盘被清空过, 子进程已经在 game_over 时清空
+            self.sent = 0
+        new_moves = [(piece.row, piece.col, piece.team.value) for piece in moves[self.sent:]]
+        self.sent = len(moves)
+        return new_moves
+
+    def play(self) -> Future:
+        """
+        开始在子进程中搜索当前局面, 立即返回
+        :return: 结果为落子位置 (row, col) 的 Future, 被中止时为已取消状态
+        """
+        if self.process is None:
+            self.start_process()
+        future = Future()
+        with self.lock:
+            self.future = future
+            self.request_id += 1
+            request_id = self.request_id
+        self.conn.send(("play", (request_id, self.new_moves())))
+        return future
+
+    def cancel(self):
+        """中止正在进行的搜索, 子进程会在下一次检查时结束本次搜索并丢弃结果"""
+        with self.lock:
+            future, request_id = self.future, self.request_id
+        if future is not None and future.cancel():
+            self.cancelled_id.value = request_id
+
+    def let_me_play(self):
+        """等待子进程搜索结束后落子"""
+        pos: Pos = self.play().result()
+        self.set_piece(Piece(*pos))
+
+    def game_over(self):
+        """对局结束或重新开始, 中止搜索并清空子进程的镜像棋盘"""
+        self.cancel()
+        self.sent = 0
+        if self.process is not None:
+            self.conn.send(("reset", None))
+
+    def close(self):
+        """结束子进程"""
+        if self.process is None:
+            return
+        self.cancel()
+        self.finalizer()  # 终结器只会执行一次
+        self.process = None
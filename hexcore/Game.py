@@ -9,9 +9,10 @@ class Game:
         self.player1: Player = None
         self.player2: Player = None
         self.board = Board(board_size)
-        self.judge = Judge()
+        self.judge = Judge(Config.judge_board)
         self.judge.set_board(self.board)
         self.current_turn = Team.RED if Config.first_player == 0 else Team.BLUE  # 先手队伍
+        self.verbose = True  # 是否输出对局结果
 
     def set_player_one(self, player: Player):
         """设置1号玩家"""
@@ -30,21 +31,38 @@ class Game:
         if self.player2.team == self.current_turn:
             return self.player2
 
-    def start(self):
-        """游戏开始"""
-        # 每次游戏开始, 清空棋盘, 重置裁判状态
+    def new_game(self):
+        """清空棋盘, 重置裁判状态和先手队伍"""
         self.board.reset()
         self.judge.reset()
+        self.current_turn = Team.RED if Config.first_player == 0 else Team.BLUE
+
+    def end_turn(self):
+        """当前玩家落子之后调用, 检查棋盘状态并轮到另一方, 出现获胜者时结束对局"""
+        if self.current_turn == self.player1.team:
+            self.current_turn = self.player2.team
+        elif self.current_turn == self.player2.team:
+            self.current_turn = self.player1.team
+        self.judge.check_winner()  # 检查棋盘状态
+        if self.judge.has_winner():
+            self.game_over()
+
+    def game_over(self):
+        """通知双方玩家对局结束, 对局中途放弃时也需要调用"""
+        self.player1.game_over()
+        self.player2.game_over()
+        if self.verbose and self.judge.has_winner():
+            print("获胜者:", self.judge.get_winner_team())
 
+    def close(self):
+        """不再使用这个对局时调用, 释放双方玩家的子进程"""
+        for player in (self.player1, self.player2):
+            if player:
+                player.close()
+
+    def start(self):
+        """游戏开始, 阻塞直到出现获胜者, 用于没有界面的对局"""
+        self.new_game()
         while not self.judge.has_winner():
-            if self.current_turn == self.player1.team:
-                self.player1.let_me_play()
-                self.current_turn = self.player2.team
-            elif self.current_turn == self.player2.team:
-                self.player2.let_me_play()
-                self.current_turn = self.player1.team
-            self.judge.check_winner()  # 检查棋盘状态
-
-        # 游戏结束
-        winner = self.judge.get_winner_team()
-        print("获胜者:", winner)
+            self.get_current_player().let_me_play()
+            self.end_turn()
@@ -0,0 +1,154 @@
+"""
+劣势位置分析 (inferior cell analysis)
+只看一个空白位置周围一圈的六个邻居, 棋盘外的位置视为所在边界一方的棋子, 判断三类不需要搜索的位置:
+    死子 (dead): 无论哪一方占据都不影响胜负, 双方都不需要在这里落子
+    被吃 (captured): 相邻的两个空白位置, 某一方只要占据其中一个, 另一个就成为死子,
+                     对手落在其中一个时可以立即在另一个应对, 所以双方都不需要在这里落子
+    被支配 (dominated): 对手落在某个相邻位置 k 之后, 这个位置就成为死子, 那么落在 k 至少和落在这里一样好
+展开结点时去掉这些位置, 减少子节点数量, 同样的时间里每个候选落子可以得到更多的模拟次数
+"""
+from functools import lru_cache
+from operator import itemgetter
+from typing import List, Tuple, Dict, NamedTuple
+
+from hexcore.Algorithms import BoardState, RedTeam, BlueTeam, NoneTeam
+from hexcore.Patterns import RING
+
+# 一圈邻居的编码, 每个邻居占两位, 第 i 个邻居的编码左移 2i 位
+EMPTY, RED, BLUE, OUTSIDE = 0, 1, 2, 3  # OUTSIDE 为棋盘角落外同时超出两条边界的位置, 不属于任何一方
+# 把 array('b') 棋盘的字节直接转换为编码, 红方 -1 的字节为 255
+TRANSLATION = bytes(RED if byte == RedTeam & 0xFF else BLUE if byte == BlueTeam else EMPTY for byte in range(256))
+CODES = {NoneTeam: EMPTY, RedTeam: RED, BlueTeam: BLUE}
+
+
+class RingTables(NamedTuple):
+    """全部 4^6 种邻居编码对应的查找表, 只计算一次"""
+    keys: Dict[Tuple[int, ...], int]  # 六个邻居的编码 -> 整数编码
+    dead: bytes  # 整数编码 -> 是否为死子
+    killers: Dict[int, Tuple[Tuple[int, ...], ...]]  # 队伍编码 -> 整数编码 -> 该方落下之后使中间成为死子的空白邻居
+    captures: Tuple[Tuple[Tuple[int, int], ...], ...]  # 整数编码 -> 前三个方向上 (i, code), code 方落在邻居 i 后中间成为死子
+
+
+def useless(ring: Tuple[int, ...], code: int) -> bool:
+    """
+    中间的位置对 code 一方是否没有用
+    code 一方可以经过的邻居 (空白或己方) 中, 任意两个都能沿着一段中间全是己方棋子的圆弧连接起来时,
+    经过中间位置的路径总能改为绕过它, 占据中间位置没有任何作用
+    """
+    usable = [i for i in range(6) if ring[i] in (EMPTY, code)]
+    for x in range(len(usable)):
+        for y in range(x + 1, len(usable)):
+            i, j = usable[x], usable[y]
+            clockwise = all(ring[k % 6] == code for k in range(i + 1, j))
+            counter = all(ring[k % 6] == code for k in range(j + 1, i + 6))
+            if not clockwise and not counter:
+                return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def ring_tables() -> RingTables:
+    """计算全部邻居编码的查找表, 对双方都没有用的位置就是死子"""
+    rings = [tuple((key >> (2 * i)) & 3 for i in range(6)) for key in range(4 ** 6)]
+    dead = bytes(useless(ring, RED) and useless(ring, BLUE) for ring in rings)
+    killers = {code: tuple(tuple(i for i in range(6) if ring[i] == EMPTY and dead[key | code << (2 * i)])
+                           for key, ring in enumerate(rings))
+               for code in (RED, BLUE)}
+    captures = tuple(tuple((i, code) for i in range(3) for code in (RED, BLUE)
+                           if ring[i] == EMPTY and dead[key | code << (2 * i)])
+                     for key, ring in enumerate(rings))
+    return RingTables({ring: key for key, ring in enumerate(rings)}, dead, killers, captures)
+
+
+@lru_cache(maxsize=None)
+def ring_table(size: int) -> Tuple[Tuple[int, ...], ...]:
+    """
+    每个位置按环绕顺序排列的六个邻居, 同一种棋盘大小只计算一次
+    棋盘外的邻居用 size * size 之后的下标表示: 上下边界为红方, 左右边界为蓝方, 角落外为 OUTSIDE
+    :return: table[index] 为六个邻居在扩展后的编码数组中的下标
+    """
+    red_edge, blue_edge, outside = size * size, size * size + 1, size * size + 2
+    table = []
+    for row in range(size):
+        for col in range(size):
+            ring = []
+            for dr, dc in RING:
+                r, c = row + dr, col + dc
+                row_inside, col_inside = 0 <= r < size, 0 <= c < size
+                if row_inside and col_inside:
+                    ring.append(r * size + c)
+                elif col_inside:
+                    ring.append(red_edge)
+                elif row_inside:
+                    ring.append(blue_edge)
+                else:
+                    ring.append(outside)
+            table.append(tuple(ring))
+    return tuple(table)
+
+
+@lru_cache(maxsize=None)
+def ring_getters(size: int) -> Tuple[itemgetter, ...]:
+    """每个位置取出六个邻居编码的 itemgetter, 一次调用在 C 中完成六次下标访问"""
+    return tuple(itemgetter(*ring) for ring in ring_table(size))
+
+
+def inferior_cells(state: BoardState) -> Tuple[List[int], List[int], List[int]]:
+    """
+    分析当前局面中的劣势位置
+    :return: 死子, 被吃的位置, 对当前下棋方被支配的位置, 均为一维棋盘下标
+    """
+    size = state.size
+    tables, rings = ring_tables(), ring_table(size)
+    codes = state.cells.tobytes().translate(TRANSLATION) + bytes((RED, BLUE, OUTSIDE))
+    ring_keys, dead_keys = tables.keys, tables.dead
+
+    keys = {}  # 与已有棋子相邻的空白位置的邻居编码, 周围全空的位置不可能是劣势位置
+    for index, getter in enumerate(ring_getters(size)):
+        if codes[index] == EMPTY:
+            key = ring_keys[getter(codes)]
+            if key:
+                keys[index] = key
+
+    dead = [index for index, key in keys.items() if dead_keys[key]]
+    dead_set = set(dead)
+
+    # 被吃: 某一方占据其中一个之后另一个成为死子, 只保留互不重叠的位置对, 重叠时对手可以同时威胁两处
+    pairs = []
+    captures = tables.captures
+    for index, key in keys.items():
+        if index in dead_set:
+            continue
+        for i, code in captures[key]:  # 每一对只从其中一个位置检查一次, 另一个位置在对面的方向上
+            other_index = rings[index][i]
+            other_key = keys.get(other_index)
+            if other_key and other_index not in dead_set and dead_keys[other_key | code << (2 * (i + 3))]:
+                if not pairs or pairs[-1] != (index, other_index):  # 双方都能吃掉时只记录一次
+                    pairs.append((index, other_index))
+    count = {}
+    for pair in pairs:
+        for index in pair:
+            count[index] = count.get(index, 0) + 1
+    captured = [index for pair in pairs if count[pair[0]] == count[pair[1]] == 1 for index in pair]
+    pruned = dead_set.union(captured)
+
+    # 被支配: 对手落在相邻的 k 之后成为死子, 只有 k 本身不会被剪掉时才剪掉这个位置, 避免互相支配时两个都被剪掉
+    killers = {}
+    if state.turn != NoneTeam:
+        table = tables.killers[CODES[-state.turn]]
+        for index, key in keys.items():
+            if index not in pruned and table[key]:
+                killers[index] = [rings[index][i] for i in table[key]]
+    dominated = [index for index, ks in killers.items()
+                 if any(k not in pruned and k not in killers for k in ks)]
+    return dead, captured, dominated
+
+
+def prune_moves(state: BoardState) -> List[int]:
+    """去掉劣势位置之后的候选落子, 全部被剪掉时返回所有空白位置"""
+    moves = state.empty_indices()
+    dead, captured, dominated = inferior_cells(state)
+    if not (dead or captured or dominated):
+        return moves
+    pruned = set(dead).union(captured, dominated)
+    return [index for index in moves if index not in pruned] or moves
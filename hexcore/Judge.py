@@ -1,45 +1,65 @@
 from typing import List, Tuple
 
-from hexcore.Algorithms import BFS
+from hexcore.Algorithms import BFS, BoardState, NoneTeam, board_class
 from hexcore.Board import Board, Team
 
 
 class Judge:
-    """裁判"""
+    """
+    裁判
+    内部维护一个棋盘状态, 每次检查只把新增的落子合并进去, 判断胜负接近常数时间
+    只有出现获胜者时才使用 BFS 计算一次获胜路径
+    """
 
-    def __init__(self):
+    def __init__(self, board: str = "array"):
+        """:param board: 裁判使用的棋盘状态实现, array 为一维数组加并查集, bitboard 为位棋盘"""
         self.board: Board = None
+        self.board_class = board_class(board)
         self.winner_path: List = []  # 获胜者的其中路径
         self.winner_team: Team = Team.NONE  # 获胜的队伍
+        self.state: BoardState = None  # 裁判记录的棋盘状态, 增量更新
+        self.checked = 0  # 已经合并进棋盘状态的落子数量
 
     def reset(self):
         """清空裁判状态"""
         self.winner_team = Team.NONE
         self.winner_path = []
+        self.state = None
+        self.checked = 0
 
     def set_board(self, board):
         self.board = board
+        self.reset()
 
     def has_winner(self):
         """是否有人获胜"""
         return self.winner_team != Team.NONE
 
+    def sync(self):
+        """把棋盘上新增的落子合并进棋盘状态, 棋盘被重置过时重新开始"""
+        size, moves = self.board.size, self.board.moves
+        if self.state is None or self.state.size != size or self.checked > len(moves):
+            self.state = self.board_class([[NoneTeam] * size for _ in range(size)], NoneTeam)
+            self.checked = 0
+        state = self.state
+        for piece in moves[self.checked:]:
+            state.turn = piece.team.value  # 按棋子所属队伍落子
+            state.play(piece.row * size + piece.col)
+        self.checked = len(moves)
+
     def check_winner(self):
         """检查棋盘状态, 是否出现获胜者"""
-        bfs = BFS(self.board.state())
-
-        red_path = bfs.find_red_path()
-        blue_path = bfs.find_blue_path()
-
-        if red_path:
-            self.winner_path = red_path  # 记录胜者棋子路径
-            self.winner_team = Team.RED  # 红方胜利
+        self.sync()
+        winner = self.state.get_winner()
+        if winner == NoneTeam:
             return
 
-        if blue_path:
-            self.winner_path = blue_path
-            self.winner_team = Team.BLUE  # 蓝方胜
-            return
+        self.winner_team = Team(winner)
+        bfs = BFS(self.board.state())
+        if self.winner_team == Team.RED:
+            self.winner_path = bfs.find_red_path()  # 记录胜者棋子路径
+        else:
+            self.winner_path = bfs.find_blue_path()
 
     def get_winner_team(self) -> Team:
         """获取获胜的一方队伍"""
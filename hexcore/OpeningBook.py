@@ -0,0 +1,200 @@
+"""
+开局库
+离线对开局的局面进行长时间的蒙特卡洛搜索, 把局面的标准哈希值和最佳落子写入紧凑的二进制文件
+对局时通过 mmap 按需读取文件, 在有序的记录中二分查找, 查到就不需要再搜索
+
+文件格式(小端):
+    头部 magic(4s) version(H) size(H) count(I)
+    记录 hash(Q) move(H) score(H), 按 hash 升序排列, move 为标准朝向下的一维棋盘下标, score 为胜率 * 10000
+
+生成开局库:
+    python -m hexcore.OpeningBook --size 11 --plies 2 --time 10
+"""
+import mmap
+import struct
+from argparse import ArgumentParser
+from os import path, makedirs
+from typing import Dict, Optional, Tuple
+
+from hexcore.Algorithms import MCTS, BoardState, Pos, RedTeam, BlueTeam, NoneTeam
+
+MAGIC = b"HEXB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+RECORD = struct.Struct("<QHH")
+
+
+class OpeningBook:
+    """开局库文件, 第一次查询时才打开文件并建立 mmap"""
+
+    default_dir = path.join(path.dirname(__file__), "books")  # 默认的开局库目录
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.file = None
+        self.mm: Optional[mmap.mmap] = None
+        self.size = 0  # 开局库对应的棋盘大小
+        self.count = 0  # 记录数量
+        self.loaded = False  # 是否已经尝试加载
+
+    @staticmethod
+    def book_path(size: int, book_dir: str = None) -> str:
+        """棋盘大小对应的开局库文件路径"""
+        return path.join(book_dir or OpeningBook.default_dir, f"opening-{size}.bin")
+
+    def load(self) -> bool:
+        """打开文件并建立 mmap, 文件不存在或格式不对时返回 False"""
+        if self.loaded:
+            return self.mm is not None
+        self.loaded = True
+        if not path.isfile(self.file_path):
+            return False
+        self.file = open(self.file_path, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size, self.count = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION or len(self.mm) != HEADER.size + self.count * RECORD.size:
+            self.close()
+            return False
+        return True
+
+    def close(self):
+        """关闭 mmap 和文件"""
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def find(self, key: int) -> Optional[Tuple[int, int]]:
+        """二分查找标准哈希值对应的记录, 返回 (move, score)"""
+        if not self.load():
+            return None
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            mid_key, move, score = RECORD.unpack_from(self.mm, HEADER.size + mid * RECORD.size)
+            if mid_key < key:
+                low = mid + 1
+            elif mid_key > key:
+                high = mid
+            else:
+                return move, score
+        return None
+
+    def lookup(self, state: BoardState) -> Optional[Pos]:
+        """查询局面的最佳落子, 不在开局库中时返回 None"""
+        key, rotated = state.canonical_hash()
+        record = self.find(key)
+        if record is None:
+            return None
+        move = record[0]
+        if rotated:  # 记录的是旋转后棋盘上的落子, 转换回原棋盘
+            move = state.size * state.size - 1 - move
+        if state.cells[move] != NoneTeam:  # 哈希冲突
+            return None
+        return divmod(move, state.size)
+
+    @staticmethod
+    def write(file_path: str, size: int, entries: Dict[int, Tuple[int, int]]):
+        """把 {标准哈希值: (move, score)} 写入开局库文件"""
+        makedirs(path.dirname(path.abspath(file_path)), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, size, len(entries)))
+            for key in sorted(entries):
+                move, score = entries[key]
+                f.write(RECORD.pack(key, move, score))
+
+
+_books: Dict[str, OpeningBook] = {}  # 已打开的开局库, 每个文件只打开一次
+
+
+def get_book(size: int, book_dir: str = None) -> OpeningBook:
+    """获取棋盘大小对应的开局库, 文件在第一次查询时才加载"""
+    file_path = OpeningBook.book_path(size, book_dir)
+    if file_path not in _books:
+        _books[file_path] = OpeningBook(file_path)
+    return _books[file_path]
+
+
+class BookBuilder:
+    """
+    离线生成开局库
+    从空棋盘和对手任意的第一步出发, 搜索得到最佳落子后, 继续搜索对手对该落子的所有应对, 直到指定的步数
+    """
+
+    def __init__(self, size: int, plies: int, time_limit: float, playout: str = "fill", rave_k: float = 0):
+        """
+        :param size: 棋盘大小
+        :param plies: 收录的最大步数, 空棋盘为第 0 步
+        :param time_limit: 每个局面的搜索时间/秒
+        """
+        self.size = size
+        self.plies = plies
+        self.time_limit = time_limit
+        self.playout = playout
+        self.rave_k = rave_k
+        self.entries: Dict[int, Tuple[int, int]] = {}
+
+    def search(self, state: BoardState) -> int:
+        """搜索局面的最佳落子, 记录到开局库中并返回落子的下标"""
+        size = self.size
+        init_state = [list(state.cells[row * size:(row + 1) * size]) for row in range(size)]
+        mcts = MCTS(init_state, state.turn, self.playout, rave_k=self.rave_k)
+        mcts.search(self.time_limit)
+        row, col = mcts.best_move()
+        move = row * size + col
+        best = next(child for child in mcts.pool.children(mcts.root) if mcts.pool.move[child] == move)
+        score = round(mcts.pool.reward[best] / max(mcts.pool.visits[best], 1) * 10000)
+
+        key, rotated = state.canonical_hash()
+        self.entries[key] = (size * size - 1 - move if rotated else move, score)
+        return move
+
+    def visit(self, state: BoardState, ply: int):
+        """搜索局面, 然后继续搜索对手对最佳落子的全部应对"""
+        if ply > self.plies or state.get_winner() != NoneTeam or state.canonical_hash()[0] in self.entries:
+            return
+        move = self.search(state)
+        print(f"[Book] ply={ply} entries={len(self.entries)}")
+        if ply + 2 > self.plies:
+            return
+        after = state.copy()
+        after.play(move)
+        for reply, team in enumerate(after.cells):
+            if team == NoneTeam:
+                next_state = after.copy()
+                next_state.play(reply)
+                self.visit(next_state, ply + 2)
+
+    def build(self) -> Dict[int, Tuple[int, int]]:
+        """生成红方先手和蓝方先手的开局库"""
+        empty = [[NoneTeam] * self.size for _ in range(self.size)]
+        for first in (RedTeam, BlueTeam):
+            self.visit(BoardState(empty, first), 0)  # 先手方
+            for move in range(self.size * self.size):  # 后手方, 对手任意的第一步
+                state = BoardState(empty, first)
+                state.play(move)
+                self.visit(state, 1)
+        return self.entries
+
+
+def main():
+    parser = ArgumentParser(description="build an opening book for hex")
+    parser.add_argument("--size", type=int, required=True, help="棋盘大小")
+    parser.add_argument("--plies", type=int, default=2, help="收录的最大步数")
+    parser.add_argument("--time", type=float, default=10, help="每个局面的搜索时间/秒")
+    parser.add_argument("--playout", default="fill", help="模拟方式")
+    parser.add_argument("--rave-k", type=float, default=0, help="RAVE 的等价参数")
+    parser.add_argument("--output", default=None, help="输出文件, 默认为 hexcore/books/opening-<size>.bin")
+    args = parser.parse_args()
+
+    builder = BookBuilder(args.size, args.plies, args.time, args.playout, args.rave_k)
+    entries = builder.build()
+    output = args.output or OpeningBook.book_path(args.size)
+    OpeningBook.write(output, args.size, entries)
+    print(f"[Book] {len(entries)} positions written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor, Future, wait
+from math import log, sqrt
+from multiprocessing import shared_memory
+from random import seed as random_seed, randrange, choice
+from time import perf_counter, time
+from typing import Callable, Dict, List, Tuple
+
+from hexcore.Algorithms import MCTS, NodePool, Pos, State, NoneTeam, RedTeam, BlueTeam
+
+_pools: Dict[int, Tuple[ProcessPoolExecutor, object]] = {}  # 按进程数缓存的进程池和停止标志, 避免每一步都重新启动进程
+_stop = None  # 子进程中的停止标志, 由进程池初始化时传入, 非 0 时尽快结束本次搜索
+CHECK_INTERVAL = 0.05  # 等待子进程时检查是否被取消的间隔/秒
+
+
+def init_worker(stop):
+    global _stop
+    _stop = stop
+
+
+def get_pool(workers: int) -> Tuple[ProcessPoolExecutor, object]:
+    """获取指定进程数的进程池和它的停止标志, 第一次使用时创建"""
+    if workers not in _pools:
+        # 使用 spawn 启动子进程, 避免在 UI 的多线程环境下 fork
+        context = multiprocessing.get_context("spawn")
+        stop = context.Value('b', 0, lock=False)
+        pool = ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker, initargs=(stop,))
+        warm_up(pool, workers)
+        _pools[workers] = pool, stop
+    return _pools[workers]
+
+
+def prepare_pool(workers: int, parallel: str):
+    """提前启动并行搜索使用的进程池, 在创建 AI 时调用, 进程启动的时间不计入第一步的搜索时间"""
+    if parallel == "tree":
+        get_tree_pool(workers)
+    else:
+        get_pool(workers)
+
+
+def worker_ready(_=None) -> bool:
+    """子进程执行的空任务, 执行时子进程已经导入了本模块, 同时提前导入批量模拟需要的 numpy"""
+    import hexcore.BatchPlayout  # noqa: F401
+    return True
+
+
+def wait_or_cancel(futures: List[Future], stop, cancelled: Callable[[], bool] = None):
+    """等待全部子进程结束, cancelled 返回 True 时设置停止标志, 子进程会在下一次检查时结束搜索"""
+    while wait(futures, CHECK_INTERVAL).not_done:
+        if cancelled and not stop.value and cancelled():
+            stop.value = 1
+
+
+def warm_up(pool: ProcessPoolExecutor, workers: int):
+    """提前启动全部子进程并导入本模块, 避免进程启动时间计入第一次搜索"""
+    list(pool.map(worker_ready, range(workers)))
+
+
+def search_worker(init_state: State, turn: int, deadline: float, seed: int, playout: str, batch_size: int,
+                  rave_k: float, tt_size: int, board: str, prune: bool) -> Tuple[Dict[Pos, Tuple[int, int]], int, int]:
+    """
+    子进程中运行一棵独立的蒙特卡洛搜索树, 配置与单进程的 MCTS 相同
+    搜索到 deadline (time.time() 的时间戳) 或者停止标志被设置为止
+    :return: 根结点子节点的 {move: (visits, reward)}, 模拟次数, 树的结点数量
+    """
+    random_seed(seed)
+    mcts = MCTS(init_state, turn, playout, batch_size, rave_k, tt_size, False, board, prune)
+    mcts.search(deadline - time(), deadline, cancelled=lambda: _stop.value != 0)
+    children = {ch.move: (ch.visits, ch.reward) for ch in mcts.root_node.children}
+    return children, mcts.simulate_times, mcts.tree_node_num
+
+
+class RootParallelMCTS(MCTS):
+    """
+    根并行的蒙特卡洛搜索树
+    多个进程从同一个棋盘状态出发, 使用不同的随机种子各自搜索, 最后把根结点子节点的 visits 和 reward 相加
+    合并后的根结点只有一层子节点, best_move 与单进程的 MCTS 相同
+    """
+
+    def __init__(self, init_state: State, turn: int, workers: int, playout: str = "random", batch_size: int = 256,
+                 rave_k: float = 0, tt_size: int = 0, board: str = "array", prune: bool = False):
+        """其余参数与 MCTS 相同, 原样传给每个进程中的树"""
+        super(RootParallelMCTS, self).__init__(init_state, turn, playout, batch_size, board=board)
+        self.init_state = init_state
+        self.turn = turn
+        self.workers = workers  # 进程数量
+        self.options = (rave_k, tt_size, board, prune)  # 只在子进程中使用的配置
+        self.node_num = 0  # 所有进程的树的结点数量之和
+
+    def search(self, time_limit: float = 1, deadline: float = None, early_stop: bool = False,
+               extend: float = 0, cancelled: Callable[[], bool] = None) -> None:
+        """
+        每个进程在限定的时间内独立搜索, 然后合并根结点的统计信息
+        参数与 MCTS.search 相同, 时间上限和 deadline 合并为墙上时间的截止时间传给子进程, 进程池第一次启动的时间也计算在内;
+        cancelled 在等待子进程时检查; 各进程只有一部分模拟次数, 不支持 early_stop 和 extend
+        """
+        start_time = perf_counter()
+        end_time = time() + time_limit if deadline is None else min(time() + time_limit, deadline)
+        pool, stop = get_pool(self.workers)
+        stop.value = 0  # 同一个进程池中的搜索依次进行, 每次搜索前清除上一次的停止标志
+        base_seed = randrange(1 << 30)
+        futures = [pool.submit(search_worker, self.init_state, self.turn, end_time, base_seed + i,
+                               self.playout, self.batch_playout.batch_size if self.batch_playout else 0, *self.options)
+                   for i in range(self.workers)]
+        wait_or_cancel(futures, stop, cancelled)
+
+        merged: Dict[Pos, List[int]] = {}  # 合并后的根结点子节点 {move: [visits, reward]}
+        self.simulate_times = 0
+        self.node_num = 1  # 合并后的根结点
+        for future in futures:
+            children, simulate_times, node_num = future.result()
+            for move, (visits, reward) in children.items():
+                stats = merged.setdefault(move, [0, 0])
+                stats[0] += visits
+                stats[1] += reward
+            self.simulate_times += simulate_times
+            self.node_num += node_num - 1  # 不重复统计每个进程的根结点
+
+        # 合并后的树只有根结点和一层子节点
+        size = self.root_state.size
+        self.pool = NodePool(size)
+        self.root = self.pool.new_node(-1, self.turn, -1)
+        first = self.pool.add_children(self.root, [row * size + col for row, col in merged], self.turn)
+        for child, (visits, reward) in enumerate(merged.values(), first):
+            self.pool.visits[child] = visits
+            self.pool.reward[child] = reward
+        self.pool.visits[self.root] = sum(visits for visits, _ in merged.values())
+        # 统计信息, 运行时间为实际经过的时间
+        self.run_time = perf_counter() - start_time
+
+    @property
+    def tree_node_num(self) -> int:
+        """所有进程的树的结点数量之和"""
+        return self.node_num
+
+
+class SharedTree(NodePool):
+    """
+    保存在共享内存中的结点池, 各列与 NodePool 相同, 0 号结点为根结点
+    共享内存无法扩容, 结点数量达到 capacity 之后不再分配新的结点
+    """
+
+    def __init__(self, size: int, capacity: int, name: str = None):
+        """
+        :param size: 棋盘大小
+        :param capacity: 最多保存的结点数量
+        :param name: 共享内存的名字, 为 None 时创建新的共享内存, 否则连接到已有的共享内存
+        """
+        self.size = size
+        self.capacity = capacity
+        header = 8  # 头部保存已分配的结点数量
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=header + capacity * self.bytes_per_node)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        buf = self.shm.buf
+        self.header = buf[:header].cast("q")
+        offset = header
+        for column, fmt in self.columns:
+            length = capacity * array(fmt).itemsize
+            setattr(self, column, buf[offset:offset + length].cast(fmt))
+            offset += length
+
+    @property
+    def count(self) -> int:
+        """已分配的结点数量, 保存在共享内存中"""
+        return self.header[0]
+
+    @count.setter
+    def count(self, value: int):
+        self.header[0] = value
+
+    def allocate(self, count: int) -> int:
+        """分配 count 个连续的结点, 返回第一个结点的下标, 空间不足时返回 -1, 调用方需要持有锁"""
+        first = self.count
+        if first + count > self.capacity:
+            return -1
+        self.count = first + count
+        return first
+
+    def close(self, unlink: bool = False):
+        """释放对共享内存的引用, 创建者负责 unlink"""
+        self.header.release()
+        for column, _ in self.columns:
+            getattr(self, column).release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+_tree_lock = None  # 子进程展开结点时使用的锁, 由进程池初始化时传入
+
+
+def init_tree_worker(lock, stop):
+    global _tree_lock, _stop
+    _tree_lock, _stop = lock, stop
+
+
+def tree_search_worker(name: str, capacity: int, init_state: State, turn: int, deadline: float,
+                       seed: int, playout: str, virtual_loss: int, batch_size: int, board: str, prune: bool) -> int:
+    """
+    子进程中在共享的搜索树上搜索, 直到 deadline (time.time() 的时间戳)
+    选择时给经过的结点加上虚拟损失, 让其它进程倾向于选择不同的路径
+    统计信息的更新没有加锁, 并发时偶尔丢失一次更新对搜索结果影响可以忽略
+    numpy 模拟方式下每个叶子结点模拟 batch_size 局, 反向传播时按局数累加访问次数和获胜次数
+    :return: 本进程的模拟次数
+    """
+    random_seed(seed)
+    mcts = MCTS(init_state, turn, playout, batch_size, board=board, prune=prune)
+    batch_playout = mcts.batch_playout
+    root_state = mcts.root_state
+    size = root_state.size
+    tree = SharedTree(size, capacity, name)
+    move, team, parent = tree.move, tree.team, tree.parent
+    first_child, child_count = tree.first_child, tree.child_count
+    visits, reward = tree.visits, tree.reward
+    simulate_times = 0
+
+    while not simulate_times or (time() < deadline and not _stop.value):  # 至少完成一次迭代, 保证根结点已经展开
+        # 选择: 按 uct 值深入, 经过的结点加上虚拟损失
+        node = 0
+        state = root_state.copy()
+        path = [0]
+        visits[0] += virtual_loss
+        while first_child[node] >= 0:
+            first = first_child[node]
+            log_visits = log(visits[node])
+            best_value, best_nodes = -1.0, []
+            for child in range(first, first + child_count[node]):
+                n = visits[child]
+                value = float("inf") if n == 0 else reward[child] / n + 0.5 * sqrt(2 * log_visits / n)
+                if value > best_value:
+                    best_value, best_nodes = value, [child]
+                elif value == best_value:
+                    best_nodes.append(child)
+            node = choice(best_nodes)
+            state.set_piece(divmod(move[node], size))
+            visits[node] += virtual_loss
+            path.append(node)
+            if visits[node] == virtual_loss:  # 子节点还没有被探索, 直接选择它
+                break
+        else:
+            # 展开: 叶子结点由第一个到达的进程展开
+            if state.get_winner() == NoneTeam:
+                with _tree_lock:
+                    if first_child[node] < 0:
+                        moves = mcts.prune_moves(state) if mcts.prune_moves else state.empty_indices()
+                        tree.add_children(node, moves, state.turn)
+                if first_child[node] >= 0:
+                    node = randrange(first_child[node], first_child[node] + child_count[node])
+                    state.set_piece(divmod(move[node], size))
+                    visits[node] += virtual_loss
+                    path.append(node)
+
+        # 模拟和反向传播, 撤销虚拟损失
+        if batch_playout:
+            count = batch_playout.batch_size
+            red_wins = batch_playout.simulate(state)
+            wins = {RedTeam: red_wins, BlueTeam: count - red_wins}
+            for node in path:
+                visits[node] += count - virtual_loss
+                reward[node] += wins[team[node]]
+        else:
+            count = 1
+            winner = mcts.simulate(state)
+            for node in path:
+                visits[node] += 1 - virtual_loss
+                if team[node] == winner:
+                    reward[node] += 1
+        simulate_times += count
+
+    del move, team, parent, first_child, child_count, visits, reward
+    tree.close()
+    return simulate_times
+
+
+_tree_pools: Dict[int, Tuple[ProcessPoolExecutor, object]] = {}  # 树并行使用的进程池, 初始化时传入展开结点使用的锁
+
+
+def get_tree_pool(workers: int) -> Tuple[ProcessPoolExecutor, object]:
+    """获取树并行使用的进程池和它的停止标志, 第一次使用时创建"""
+    if workers not in _tree_pools:
+        context = multiprocessing.get_context("spawn")
+        stop = context.Value('b', 0, lock=False)
+        pool = ProcessPoolExecutor(workers, mp_context=context, initializer=init_tree_worker,
+                                   initargs=(context.Lock(), stop))
+        warm_up(pool, workers)
+        _tree_pools[workers] = pool, stop
+    return _tree_pools[workers]
+
+
+class TreeParallelMCTS(MCTS):
+    """
+    树并行的蒙特卡洛搜索树
+    多个进程在同一棵保存在共享内存中的树上搜索, 选择时使用虚拟损失避免所有进程挤在同一条路径上
+    搜索结束后把根结点和它的子节点复制到本进程的结点池中, best_move 与单进程的 MCTS 相同
+    """
+
+    def __init__(self, init_state: State, turn: int, workers: int, playout: str = "random",
+                 capacity: int = 1 << 20, virtual_loss: int = 1, batch_size: int = 256,
+                 board: str = "array", prune: bool = False):
+        """
+        :param workers: 进程数量
+        :param capacity: 共享内存中最多保存的结点数量, 达到上限后不再展开
+        :param virtual_loss: 选择经过结点时临时增加的访问次数(视为失败)
+        其余参数与 MCTS 相同; 共享树中没有 RAVE 和置换表, 不支持 rave_k 和 tt_size
+        """
+        super(TreeParallelMCTS, self).__init__(init_state, turn, playout, batch_size, board=board)
+        self.init_state = init_state
+        self.turn = turn
+        self.workers = workers
+        self.batch_size = batch_size
+        self.board = board
+        self.prune = prune
+        self.capacity = capacity
+        self.virtual_loss = virtual_loss
+        self.node_num = 0
+
+    def search(self, time_limit: float = 1, deadline: float = None, early_stop: bool = False,
+               extend: float = 0, cancelled: Callable[[], bool] = None) -> None:
+        """
+        所有进程在共享的树上搜索到相同的截止时间, 然后读取根结点的统计信息
+        参数与 RootParallelMCTS.search 相同, 不支持 early_stop 和 extend
+        """
+        start_time = perf_counter()
+        deadline = time() + time_limit if deadline is None else min(time() + time_limit, deadline)
+        pool, stop = get_tree_pool(self.workers)
+        stop.value = 0
+        tree = SharedTree(self.root_state.size, self.capacity)
+        tree.count = 0
+        tree.new_node(-1, self.turn, -1)
+        base_seed = randrange(1 << 30)
+        futures = [pool.submit(tree_search_worker, tree.name, self.capacity, self.init_state, self.turn,
+                               deadline, base_seed + i, self.playout, self.virtual_loss, self.batch_size,
+                               self.board, self.prune)
+                   for i in range(self.workers)]
+        wait_or_cancel(futures, stop, cancelled)
+        self.simulate_times = sum(future.result() for future in futures)
+
+        # 只把根结点和它的子节点复制到本进程的结点池中
+        self.pool = NodePool(self.root_state.size)
+        self.root = self.pool.new_node(-1, self.turn, -1)
+        self.pool.visits[self.root] = tree.visits[0]
+        children = tree.children(0)
+        first = self.pool.add_children(self.root, [tree.move[child] for child in children], self.turn)
+        for offset, child in enumerate(children):
+            self.pool.visits[first + offset] = tree.visits[child]
+            self.pool.reward[first + offset] = tree.reward[child]
+        self.node_num = tree.count
+        tree.close(unlink=True)
+        self.run_time = perf_counter() - start_time
+
+    @property
+    def tree_node_num(self) -> int:
+        """共享树的结点数量"""
+        return self.node_num
@@ -0,0 +1,105 @@
+"""
+Hex 模式表和基于模式的模拟策略
+桥 (two-bridge): 两个同色棋子不相邻, 但有两个共同的空白邻居, 对手占据其中一个时, 另一个落子就能保持连接
+边模板: 第二行 (列) 的棋子与己方边界之间有两个空白位置, 同样是对手占据其中一个时落在另一个
+模拟时按打乱的顺序填满棋盘, 只要对手侵入了上述结构, 就立即在另一个位置应对, 让模拟结果更接近真实对局
+"""
+from functools import lru_cache
+from random import shuffle
+from typing import Tuple
+
+from hexcore.Algorithms import BoardState, RedTeam, NoneTeam
+
+# 六个邻居方向, 按环绕顺序排列, 相邻的两个方向上的邻居彼此也相邻
+RING = [(-1, 0), (-1, 1), (0, 1), (1, 0), (1, -1), (0, -1)]
+
+
+@lru_cache(maxsize=None)
+def bridge_table(size: int) -> Tuple[Tuple[Tuple[int, int, int], ...], ...]:
+    """
+    计算每个位置作为桥的其中一个连接点时对应的桥, 同一种棋盘大小只计算一次
+    位置的环绕邻居中, 相隔一个的两个邻居构成一座桥, 中间的邻居就是另一个连接点
+    :return: table[index] 为 (a, b, p) 的元组, a 和 b 是桥的两端, p 是另一个连接点
+    """
+    table = []
+    for row in range(size):
+        for col in range(size):
+            ring = [(row + dr, col + dc) for dr, dc in RING]
+            entries = []
+            for i in range(6):
+                (ar, ac), (pr, pc), (br, bc) = ring[i], ring[(i + 1) % 6], ring[(i + 2) % 6]
+                if all(0 <= r < size and 0 <= c < size for r, c in ((ar, ac), (pr, pc), (br, bc))):
+                    entries.append((ar * size + ac, br * size + bc, pr * size + pc))
+            table.append(tuple(entries))
+    return tuple(table)
+
+
+@lru_cache(maxsize=None)
+def edge_table(size: int, team: int) -> Tuple[Tuple[Tuple[int, int], ...], ...]:
+    """
+    计算每个边界位置所属的边模板, 同一种棋盘大小和队伍只计算一次
+    红方的模板是第二行 (或倒数第二行) 的棋子和它在边界上的两个邻居, 蓝方的是第二列 (或倒数第二列)
+    :return: table[index] 为 (a, p) 的元组, a 是模板中的棋子, p 是边界上的另一个位置
+    """
+    table = [[] for _ in range(size * size)]
+
+    def add(anchor: Tuple[int, int], first: Tuple[int, int], second: Tuple[int, int]):
+        if not all(0 <= r < size and 0 <= c < size for r, c in (anchor, first, second)):
+            return
+        a, p, q = (r * size + c for r, c in (anchor, first, second))
+        table[p].append((a, q))
+        table[q].append((a, p))
+
+    if size > 2:
+        for i in range(size):
+            if team == RedTeam:
+                add((1, i), (0, i), (0, i + 1))  # 上边界
+                add((size - 2, i), (size - 1, i), (size - 1, i - 1))  # 下边界
+            else:
+                add((i, 1), (i, 0), (i + 1, 0))  # 左边界
+                add((i, size - 2), (i, size - 1), (i - 1, size - 1))  # 右边界
+    return tuple(tuple(entries) for entries in table)
+
+
+@lru_cache(maxsize=None)
+def pattern_table(size: int, team: int) -> Tuple[Tuple[Tuple[int, int, int], ...], ...]:
+    """
+    合并桥和 team 的边模板, 模拟时每一步只需要遍历一张表
+    边模板写成两端相同的桥 (a, a, p), 与桥使用同样的判断
+    :return: table[index] 为对手落在 index 时需要检查的 (a, b, p), a 和 b 都是 team 的棋子且 p 为空时应对 p
+    """
+    bridges, edges = bridge_table(size), edge_table(size, team)
+    return tuple(bridges[index] + tuple((a, a, p) for a, p in edges[index]) for index in range(size * size))
+
+
+def bridge_playout(state: BoardState) -> int:
+    """
+    保桥模拟: 按打乱的顺序双方轮流填满棋盘, 但落子侵入了对方的桥或边模板时, 对方立即落在另一个连接点
+    每一步只查表检查刚落下的位置, 与 fill 一样最后只判断一次胜负
+    注意: 与 fill 相同, 填满后 state 的并查集不再与棋盘一致, state 只应作为一次性的副本使用
+    """
+    winner = state.get_winner()
+    if winner != NoneTeam:  # 选择阶段已经分出胜负
+        return winner
+    size, turn = state.size, state.turn
+    theirs, mine = pattern_table(size, -turn), pattern_table(size, turn)  # 对手和自己的模式表, 每一步交换
+    cells = state.cells.tolist()  # 列表的下标访问比 array 快, 最后由 fill 写回棋盘
+    empty = state.empty_indices()
+    shuffle(empty)
+    order = []  # 实际的落子顺序, 双方严格交替, 当前下棋方先落子
+    for index in empty:
+        if cells[index] != NoneTeam:  # 已经作为应对落下的位置
+            continue
+        while index >= 0:
+            cells[index] = turn
+            order.append(index)
+            turn = -turn  # 轮到对手, 检查刚才的落子是否侵入了对手的桥或边模板, 侵入时对手立即应对
+            reply = -1
+            for a, b, p in theirs[index]:
+                if cells[a] == turn and cells[b] == turn and cells[p] == NoneTeam:
+                    reply = p
+                    break
+            index = reply
+            theirs, mine = mine, theirs
+    state.fill(order)
+    return state.get_full_board_winner()
@@ -1,8 +1,14 @@
-from typing import Callable
+from time import perf_counter
+from typing import Callable, List
 
 from gameui.Config import Config
-from hexcore.Algorithms import MCTS
-from hexcore.Board import Team, Board, Piece
+from hexcore.Algorithms import MCTS, BoardState, Pos, NoneTeam, board_class
+from hexcore.OpeningBook import get_book
+from hexcore.Parallel import RootParallelMCTS, TreeParallelMCTS, prepare_pool
+from hexcore.Ponder import Ponderer
+from hexcore.Solver import Solver, prepare_tables
+from hexcore.TimeManager import TimeManager
+from hexcore.Board import Team, Board, Piece, Snapshot
 
 
 class Player:
@@ -30,6 +36,14 @@ class Player:
         if self.operation:
             self.operation()
 
+    def game_over(self):
+        """对局结束时自动调用"""
+        pass
+
+    def close(self):
+        """不再使用玩家时调用, 释放子进程等资源"""
+        pass
+
 
 class Human(Player):
     """人类玩家"""
@@ -41,16 +55,177 @@ class Human(Player):
 class AI(Player):
     """AI玩家"""
 
-    def __init__(self, team: Team):
+    def __init__(self, team: Team, **options):
+        """
+        :param options: 引擎配置, 名字为 Config 中去掉 ai_ 前缀的配置项, 如 level=1, playout="fill",
+                        没有给出的配置项使用 Config 中的值
+        """
         super(AI, self).__init__(team)
         self.team = team
-        self.level = Config.ai_level
+        self.options = options
+        self.level = self.option("level")
+        self.verbose = True  # 是否输出每一步的搜索信息
+        self.mcts: MCTS = None  # 上一次搜索使用的树, 单进程搜索时在两步之间复用
+        self.last_count = None  # 上一次落子之后棋盘上的落子数量, 用于找出对手的落子
+        self.ponderer: Ponderer = None  # 后台思考的子进程, 第一次使用时启动
+        self.ponder_times = 0  # 本步之前后台思考的模拟次数
+        self.cancelled: Callable[[], bool] = None  # 返回 True 时尽快结束本步的搜索, 用于在子进程中中止思考
+        self.solver: Solver = None  # 残局求解器, 第一次使用时创建, 置换表在整局和多局之间保留
+        budget = self.option("time_budget")
+        self.time_manager = TimeManager(budget) if budget else None  # 整局的时间管理, 没有总时间时每步固定 level 秒
+        if self.option("workers") > 1:  # 提前启动并行搜索的进程池, 进程启动的时间不计入第一步
+            prepare_pool(self.option("workers"), self.option("parallel"))
+
+    def option(self, name: str):
+        """获取引擎配置, 没有单独配置时使用 Config.ai_<name>"""
+        if name in self.options:
+            return self.options[name]
+        return getattr(Config, f"ai_{name}")
+
+    def log(self, message: str, end: str = "\n"):
+        """输出搜索信息"""
+        if self.verbose:
+            print(message, end=end)
+
+    def play_from_book(self) -> bool:
+        """在开局库中查询当前局面, 查到就直接落子, 返回是否成功"""
+        snapshot = self.board.snapshot()
+        state = BoardState.from_cells(snapshot.cells(), snapshot.size, self.team.value)
+        move = get_book(snapshot.size, self.option("book_dir")).lookup(state)
+        if move is None:
+            return False
+        row, col = move
+        self.set_piece(Piece(row, col))
+        self.log(f"[AI] {self.team} set piece at ({row}, {col})\t| from opening book")
+        if self.ponderer:  # 后台思考的树对应上一步的局面, 开局库落子之后不再使用
+            self.ponderer.cancel()
+        self.mcts = None  # 开局库落子之后没有可以复用的树
+        self.last_count = len(self.board.moves)
+        return True
+
+    def prepare_solver(self, size: int):
+        """创建求解器并建立查找表, 在本步开始计时之前调用, 第一次建立劣势位置的查找表需要约 0.1 秒"""
+        if self.solver is None:
+            self.solver = Solver()
+        prepare_tables(size)
+
+    def play_from_solver(self, snapshot: Snapshot, time_limit: float) -> bool:
+        """用证明数搜索在 time_limit 秒内求解当前局面, 证明自己必胜就直接落子, 返回是否成功"""
+        state = board_class(self.option("board")).from_cells(snapshot.cells(), snapshot.size, self.team.value)
+        result = self.solver.solve(state, time_limit, self.cancelled)
+        if result.winner != self.team.value or result.move is None:  # 没有解出或者必败, 交给蒙特卡洛搜索尽量周旋
+            return False
+        row, col = result.move
+        self.set_piece(Piece(row, col))
+        self.log(f"[AI] {self.team} set piece at ({row}, {col})\t| solved, nodes={result.nodes}, "
+                 f"run_time={result.run_time:.2f}")
+        if self.ponderer:  # 已经解出的局面不需要后台思考
+            self.ponderer.cancel()
+        self.mcts = None
+        self.last_count = len(self.board.moves)
+        return True
+
+    def new_moves(self) -> List[Pos]:
+        """上一次落子之后棋盘上新增的落子, 也就是对手的落子"""
+        moves = self.board.moves
+        if self.last_count is None or len(moves) < self.last_count:  # 棋盘被清空过
+            return []
+        return [(piece.row, piece.col) for piece in moves[self.last_count:]]
+
+    def get_mcts(self, snapshot: Snapshot) -> MCTS:
+        """
+        获取本次搜索使用的树
+        单进程搜索时, 对比棋盘状态找出对手的落子, 如果正在后台思考, 取出后台搜索树中对应的子树,
+        否则把旧树中对应的子树作为新的根结点, 子树不存在时才新建一棵树
+        """
+        workers, playout = self.option("workers"), self.option("playout")
+        batch_size, board, prune = self.option("batch_size"), self.option("board"), self.option("prune")
+        if workers > 1 and self.option("parallel") == "tree":
+            if self.option("rave_k") or self.option("tt_size"):
+                self.log("[AI] warning: tree parallel search ignores rave_k and tt_size")
+            return TreeParallelMCTS(snapshot.state(), self.team.value, workers, playout,
+                                    batch_size=batch_size, board=board, prune=prune)
+        if workers > 1:
+            return RootParallelMCTS(snapshot.state(), self.team.value, workers, playout, batch_size,
+                                    self.option("rave_k"), self.option("tt_size"), board, prune)
+
+        if self.mcts:
+            moves = self.new_moves()
+            if self.ponderer and self.ponderer.pondering:
+                mcts, self.ponder_times = self.ponderer.stop(moves)
+                if mcts and len(moves) == 1:
+                    return mcts
+            if len(moves) == 1 and self.mcts.move_root(moves):
+                return self.mcts
+        return MCTS(snapshot, self.team.value, playout, self.option("batch_size"),
+                    self.option("rave_k"), self.option("tt_size"), self.option("profile"), self.option("board"),
+                    self.option("prune"))
 
     def let_me_play(self):
-        mcts = MCTS(self.board.state(), self.team.value)
-        print(f"[AI] {self.team} searching in {self.level}s...", end='')
-        mcts.search(Config.ai_level)
+        if self.option("opening_book") and self.play_from_book():
+            return
+        snapshot = self.board.snapshot()
+        empty_cells = snapshot.data.count(NoneTeam)
+        solve = 0 < empty_cells <= self.option("solver_empty")  # 为 0 时不使用求解器
+        if solve:
+            self.prepare_solver(snapshot.size)
+        time_limit, extend, deadline = self.level, 0, None
+        if self.time_manager:
+            time_limit, extend, deadline = self.time_manager.allocate(empty_cells, snapshot.size ** 2)
+        if solve:
+            # 求解残局的时间也从本步分配的时间中扣除, 最多使用一半, 没有解出时剩下的时间用于蒙特卡洛搜索
+            start_time = perf_counter()
+            if self.play_from_solver(snapshot, min(self.option("solver_time"), time_limit / 2)):
+                if self.time_manager:
+                    self.time_manager.finish()
+                return
+            # 单个局面的展开可能略微超出求解时间, 蒙特卡洛搜索至少保留一半时间
+            time_limit = max(time_limit - (perf_counter() - start_time), time_limit / 2)
+        mcts = self.get_mcts(snapshot)
+        self.log(f"[AI] {self.team} searching in {time_limit:.2f}s...", end='')
+        # 并行搜索同样遵守截止时间和取消, 但不支持提前结束和延长
+        mcts.search(time_limit, deadline, self.option("early_stop"), extend, self.cancelled)
+        if self.time_manager:
+            self.time_manager.finish()
         row, col = mcts.best_move()
         self.set_piece(Piece(row, col))
-        simulate_times, node_count, run_time = mcts.statistics
-        print(f"\r[AI] {self.team} set piece at ({row}, {col})\t| {simulate_times=}, {node_count=}, {run_time=}")
+        simulate_times, node_count, run_time, tt_hit_rate, tt_bytes = mcts.statistics
+        info = f"{simulate_times=}, {node_count=}, {run_time=}"
+        if mcts.stopped_early or mcts.extended:
+            info += ", stopped_early" if mcts.stopped_early else ", extended"
+        if self.time_manager:
+            info += f", remaining={self.time_manager.remaining:.2f}"
+        if self.ponder_times:
+            info += f", ponder_times={self.ponder_times}"
+            self.ponder_times = 0
+        if mcts.tt:
+            info += f", {tt_hit_rate=:.2f}, {tt_bytes=}"
+        self.log(f"\r[AI] {self.team} set piece at ({row}, {col})\t| {info}")
+        if mcts.profile:
+            self.log(str(mcts.profile))
+        # 保留自己落子之后的子树, 等对手落子后继续使用
+        self.mcts = mcts if type(mcts) is MCTS and mcts.move_root([(row, col)]) else None
+        self.last_count = len(self.board.moves)
+        if self.mcts and self.option("ponder") and self.mcts.root_state.get_winner() == NoneTeam:
+            self.ponder(self.mcts)
+
+    def ponder(self, mcts: MCTS):
+        """在后台子进程中继续搜索自己落子之后的局面, 直到对手落子"""
+        if self.ponderer is None:
+            self.ponderer = Ponderer()
+        self.ponderer.start(mcts)
+
+    def game_over(self):
+        """对局结束, 停止后台思考, 重置整局的时间"""
+        self.mcts, self.last_count = None, None
+        if self.ponderer:
+            self.ponderer.cancel()
+        if self.time_manager:
+            self.time_manager.reset()
+
+    def close(self):
+        """结束后台思考的子进程, 之后仍然可以继续使用, 需要时重新启动"""
+        self.game_over()
+        if self.ponderer:
+            self.ponderer.close()
+            self.ponderer = None
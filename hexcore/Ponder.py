@@ -0,0 +1,102 @@
+"""
+后台思考 (pondering)
+AI 落子之后, 在一个常驻的子进程中继续搜索落子后的局面, 也就是在对手思考的时间里搜索对手所有可能的落子
+对手落子之后停止后台搜索, 取出对手落子对应的子树交给 AI, AI 在这棵树上继续本步的限时搜索
+后台搜索在独立的进程中运行, 不和界面线程竞争 GIL
+"""
+import multiprocessing
+from multiprocessing.connection import Connection
+from typing import List, Optional, Tuple
+
+from hexcore.Algorithms import MCTS, Pos
+
+PONDER_SLICE = 0.05  # 后台每次搜索的时间/秒, 每次搜索之后检查是否收到停止命令
+
+
+def ponder_worker(conn: Connection):
+    """
+    后台思考的子进程, 循环接收命令:
+        ("ponder", mcts): 在 mcts 上持续搜索, 直到收到下一条命令
+        ("stop", moves): 把根结点移动到对手的落子, 返回 (mcts, 后台模拟次数), 子树不存在时返回 (None, 后台模拟次数)
+        ("cancel", None): 丢弃搜索树, 返回 (None, 后台模拟次数)
+        ("quit", None): 退出进程
+    """
+    while True:
+        try:
+            command, payload = conn.recv()
+        except (EOFError, OSError):  # AI 所在的进程已经关闭管道或退出
+            return
+        if command == "quit":
+            return
+        if command != "ponder":
+            conn.send((None, 0))
+            continue
+
+        mcts: MCTS = payload
+        simulate_times = 0
+        try:
+            while not conn.poll():
+                mcts.search(PONDER_SLICE)
+                simulate_times += mcts.simulate_times
+
+            command, moves = conn.recv()
+            if command == "stop" and moves and mcts.move_root(moves):
+                conn.send((mcts, simulate_times))
+            else:
+                conn.send((None, simulate_times))
+        except (EOFError, OSError):
+            return
+        if command == "quit":
+            return
+
+
+class Ponderer:
+    """后台思考的常驻子进程, 同一时间只在一棵树上思考"""
+
+    def __init__(self):
+        # 使用 spawn 启动子进程, 避免在 UI 的多线程环境下 fork
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=ponder_worker, args=(child_conn,), daemon=True)
+        self.process.start()
+        self.pondering = False  # 子进程是否正在后台搜索
+
+    def start(self, mcts: MCTS):
+        """在子进程中继续搜索 mcts, mcts 的根结点应当是 AI 落子之后, 轮到对手下棋的局面"""
+        if self.pondering:
+            self.cancel()
+        self.conn.send(("ponder", mcts))
+        self.pondering = True
+
+    def stop(self, moves: List[Pos]) -> Tuple[Optional[MCTS], int]:
+        """
+        停止后台搜索, 取出对手落子对应的子树
+        :param moves: 后台搜索开始之后棋盘上新增的落子, 一般是对手的一步棋
+        :return: 根结点为当前局面的搜索树, 子树不存在时为 None; 后台的模拟次数
+        """
+        if not self.pondering:
+            return None, 0
+        self.pondering = False
+        self.conn.send(("stop", moves))
+        return self.conn.recv()
+
+    def cancel(self):
+        """停止后台搜索并丢弃搜索树, 用于对局结束或重新开始"""
+        if not self.pondering:
+            return
+        self.pondering = False
+        self.conn.send(("cancel", None))
+        self.conn.recv()
+
+    def close(self, timeout: float = 5.0):
+        """结束子进程, 子进程已经退出或者没有及时退出时也能正常返回"""
+        try:
+            self.cancel()
+            self.conn.send(("quit", None))
+        except (EOFError, OSError):  # 子进程已经退出
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
@@ -0,0 +1,116 @@
+"""
+无界面的 AI 对抗 (game_mode = 3)
+不依赖 pygame, 直接使用 Game, Judge 和 AI 在进程池中同时进行多局对弈, 双方轮流执红先手,
+每局结果写入 CSV 文件, 最后输出 A 引擎的胜率和 95% 置信区间
+
+    python -m hexcore.SelfPlay --size 9 --games 200 --workers 8 \
+        --engine-a '{"level": 0.5, "rave_k": 300}' --engine-b '{"level": 0.5}' --output results.csv
+"""
+import csv
+import json
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from math import sqrt
+from random import seed as random_seed
+from time import perf_counter
+from typing import Dict, Tuple
+
+from hexcore.Board import Team
+from hexcore.Game import Game
+from hexcore.Player import AI
+
+
+def play_game(game_id: int, size: int, red_options: Dict, blue_options: Dict,
+              seed: int) -> Tuple[int, str, int, float]:
+    """
+    进行一局对弈
+    :return: 对局编号, 获胜方 (red / blue), 总步数, 耗时/秒
+    """
+    random_seed(seed)
+    start_time = perf_counter()
+    game = Game(size)
+    game.verbose = False
+    red, blue = AI(Team.RED, **red_options), AI(Team.BLUE, **blue_options)
+    red.verbose = blue.verbose = False
+    game.set_player_one(red)
+    game.set_player_two(blue)
+    try:
+        game.start()
+    finally:
+        game.close()  # 进程池中的进程会进行多局对弈, 每局都要结束后台思考的子进程
+    moves = sum(piece.team != Team.NONE for piece in game.board.items())
+    winner = "red" if game.judge.get_winner_team() == Team.RED else "blue"
+    return game_id, winner, moves, perf_counter() - start_time
+
+
+def wilson_interval(wins: int, games: int, z: float = 1.96) -> Tuple[float, float]:
+    """胜率的 Wilson 置信区间, 默认 95%"""
+    if games == 0:
+        return 0, 1
+    p = wins / games
+    center = (p + z * z / (2 * games)) / (1 + z * z / games)
+    margin = z * sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / (1 + z * z / games)
+    return center - margin, center + margin
+
+
+def load_options(value: str) -> Dict:
+    """引擎配置可以是 JSON 字符串, 也可以是 JSON 文件路径"""
+    if value.lstrip().startswith("{"):
+        return json.loads(value)
+    with open(value) as f:
+        return json.load(f)
+
+
+def main():
+    parser = ArgumentParser(description="headless parallel self-play for hex engines")
+    parser.add_argument("--size", type=int, default=9, help="棋盘大小")
+    parser.add_argument("--games", type=int, default=100, help="对局数量")
+    parser.add_argument("--workers", type=int, default=None, help="进程数量, 默认为 CPU 核数")
+    parser.add_argument("--engine-a", default="{}", help="A 引擎配置, JSON 字符串或文件, 如 '{\"level\": 1}'")
+    parser.add_argument("--engine-b", default="{}", help="B 引擎配置, JSON 字符串或文件")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子, 第 i 局使用 seed + i")
+    parser.add_argument("--output", default="selfplay.csv", help="对局结果文件")
+    args = parser.parse_args()
+
+    engines = {"A": load_options(args.engine_a), "B": load_options(args.engine_b)}
+    for options in engines.values():
+        options.setdefault("opening_book", False)
+        options.setdefault("ponder", False)  # 双方交替搜索, 后台思考只会抢占对方的 CPU 时间
+    a_wins, a_red_wins, a_red_games, finished = 0, 0, 0, 0
+
+    with ProcessPoolExecutor(args.workers) as pool, open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["game", "red", "blue", "winner", "moves", "seconds"])
+        futures = {}
+        for game_id in range(args.games):
+            red, blue = ("A", "B") if game_id % 2 == 0 else ("B", "A")  # 双方轮流执红先手
+            future = pool.submit(play_game, game_id, args.size, engines[red], engines[blue], args.seed + game_id)
+            futures[future] = (red, blue)
+
+        for future in as_completed(futures):
+            red, blue = futures[future]
+            game_id, winner, moves, seconds = future.result()
+            winner_engine = red if winner == "red" else blue
+            writer.writerow([game_id, red, blue, winner_engine, moves, f"{seconds:.2f}"])
+            f.flush()
+
+            finished += 1
+            a_wins += winner_engine == "A"
+            if red == "A":
+                a_red_games += 1
+                a_red_wins += winner_engine == "A"
+            low, high = wilson_interval(a_wins, finished)
+            print(f"[{finished}/{args.games}] game {game_id}: winner={winner_engine} ({winner}), "
+                  f"A win rate={a_wins / finished:.3f} [{low:.3f}, {high:.3f}]")
+
+    low, high = wilson_interval(a_wins, finished)
+    print(f"A: {engines['A']}")
+    print(f"B: {engines['B']}")
+    print(f"A won {a_wins}/{finished} = {a_wins / finished:.3f}, 95% CI [{low:.3f}, {high:.3f}]")
+    if a_red_games and a_red_games < finished:
+        print(f"A as red: {a_red_wins}/{a_red_games}, "
+              f"A as blue: {a_wins - a_red_wins}/{finished - a_red_games}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+证明数搜索求解器
+使用深度优先的证明数搜索 (df-pn) 求出局面的胜负和必胜的落子, 结果是确定的, 不依赖随机模拟
+每个局面保存 (phi, delta), phi 为证明当前下棋方获胜还需要展开的叶子数量, delta 为证明其失败需要的数量,
+子局面 c 的 phi 是父局面的 delta, 父局面的 phi = min(delta(c)), delta = sum(phi(c))
+置换表在多次求解之间保留, 已经解出的局面下一次直接查到; 候选落子先去掉劣势位置, 再按与棋子的接触和离中心的距离排序
+每个局面先检查一步获胜: 当前下棋方能一步获胜时直接证明, 对手有两处一步获胜时直接否证, 只有一处时必须堵在那里
+
+求解空棋盘:
+    python -m hexcore.Solver --size 4
+"""
+from argparse import ArgumentParser
+from functools import lru_cache
+from itertools import islice
+from time import perf_counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from hexcore.Algorithms import BoardState, Pos, RedTeam, BlueTeam, NoneTeam, neighbor_table, board_class
+from hexcore.Inferior import prune_moves, ring_tables, ring_getters
+
+INF = 1 << 30  # 证明数的无穷大
+
+
+class SolveResult(NamedTuple):
+    """一次求解的结果"""
+    winner: int  # 当前局面的获胜方, 没有在时间内解出时为 NoneTeam
+    move: Optional[Pos]  # 当前下棋方获胜时的必胜落子, 否则为 None
+    nodes: int  # 本次展开的局面数量
+    run_time: float  # 本次求解的时间/秒
+
+
+class SolverTimeout(Exception):
+    """超过时间上限或被取消, 用于从递归中直接返回"""
+
+
+@lru_cache(maxsize=None)
+def center_distance(size: int) -> Tuple[int, ...]:
+    """每个位置到棋盘中心的六边形距离的两倍, 用于排序候选落子"""
+    center = size - 1  # 坐标乘 2 之后的中心, 避免小数
+    distance = []
+    for row in range(size):
+        for col in range(size):
+            dr, dc = 2 * row - center, 2 * col - center
+            distance.append(max(abs(dr), abs(dc), abs(dr + dc)))
+    return tuple(distance)
+
+
+@lru_cache(maxsize=None)
+def edge_flags(size: int, team: int) -> Tuple[int, ...]:
+    """每个位置接触 team 一方边界的标记, 1 为第一条边界 (上或左), 2 为第二条边界 (下或右)"""
+    flags = []
+    for row in range(size):
+        for col in range(size):
+            line = row if team == RedTeam else col
+            flags.append((line == 0) | (line == size - 1) << 1)
+    return tuple(flags)
+
+
+def winning_cells(state: BoardState) -> Dict[int, List[int]]:
+    """
+    双方各自落下一子就能获胜的空白位置
+    先把每一方的棋子按连通块标记接触到的边界, 空白位置加上相邻同色连通块的标记同时接触两条边界就是获胜位置
+    """
+    size, cells = state.size, state.cells
+    neighbors = neighbor_table(size)
+    wins = {}
+    for team in (RedTeam, BlueTeam):
+        edges = edge_flags(size, team)
+        group_flags = {}  # 棋子下标 -> 所在连通块接触到的边界
+        for start, cell in enumerate(cells):
+            if cell != team or start in group_flags:
+                continue
+            group, stack, flag = [start], [start], 0
+            group_flags[start] = 0
+            while stack:
+                index = stack.pop()
+                flag |= edges[index]
+                for nb in neighbors[index]:
+                    if cells[nb] == team and nb not in group_flags:
+                        group_flags[nb] = 0
+                        group.append(nb)
+                        stack.append(nb)
+            for index in group:
+                group_flags[index] = flag
+        wins[team] = []
+        for index, cell in enumerate(cells):
+            if cell != NoneTeam:
+                continue
+            flag = edges[index]
+            for nb in neighbors[index]:
+                flag |= group_flags.get(nb, 0)
+            if flag == 3:
+                wins[team].append(index)
+    return wins
+
+
+def prepare_tables(size: int):
+    """提前建立求解 size 阶棋盘需要的全部查找表, 避免第一次求解时计入求解时间"""
+    ring_tables()
+    ring_getters(size)
+    neighbor_table(size)
+    center_distance(size)
+    for team in (RedTeam, BlueTeam):
+        edge_flags(size, team)
+
+
+class Solver:
+    """
+    df-pn 求解器
+    置换表以 Zobrist 哈希值为键, 超过容量时腾出一半空间, 优先删除没有解出的局面
+    """
+
+    check_interval = 64  # 每展开多少个局面检查一次是否被取消, 时间每个局面都检查, 相比展开局面的开销可以忽略
+
+    def __init__(self, capacity: int = 1 << 18):
+        """:param capacity: 置换表最多保存的局面数量"""
+        self.capacity = capacity
+        self.table: Dict[int, Tuple[int, int]] = {}  # {hash: (phi, delta)}
+        self.nodes = 0  # 本次求解展开的局面数量
+        self.end_time = float('inf')
+        self.cancelled: Callable[[], bool] = None
+
+    def solve(self, state: BoardState, time_limit: float = float('inf'),
+              cancelled: Callable[[], bool] = None) -> SolveResult:
+        """
+        求解当前局面, state 不会被修改
+        :param time_limit: 时间上限/秒, 超时时返回 winner 为 NoneTeam 的结果, 已经算出的证明数仍保留在置换表中
+        :param cancelled: 返回 True 时尽快结束求解
+        """
+        start_time = perf_counter()
+        self.nodes, self.end_time, self.cancelled = 0, start_time + time_limit, cancelled
+        winner = state.get_winner()
+        if winner == NoneTeam:
+            try:
+                self.mid(state, INF, INF)
+            except SolverTimeout:
+                pass
+            phi, delta = self.table.get(state.hash, (1, 1))
+            winner = state.turn if phi == 0 else -state.turn if delta == 0 else NoneTeam
+        move = self.winning_move(state) if winner == state.turn else None
+        return SolveResult(winner, move, self.nodes, perf_counter() - start_time)
+
+    def winning_move(self, state: BoardState) -> Optional[Pos]:
+        """已经证明当前下棋方获胜时, 优先选择一步获胜的位置, 否则从置换表中找出 delta 为 0 (对手必败) 的子局面"""
+        wins = winning_cells(state)
+        if wins[state.turn]:
+            return divmod(wins[state.turn][0], state.size)
+        for move, child_key in self.children(state, wins[-state.turn]):
+            if self.table.get(child_key, (1, 1))[1] == 0:
+                return divmod(move, state.size)
+        return None
+
+    def children(self, state: BoardState, threats: List[int]) -> List[Tuple[int, int]]:
+        """
+        排好序的候选落子和落子之后局面的哈希值
+        对手有一步获胜的位置时只能堵在那里, 否则先去掉劣势位置, 再优先考虑与棋子相邻的位置, 相同时离中心近的在前
+        """
+        size, cells = state.size, state.cells
+        neighbors, distance = neighbor_table(size), center_distance(size)
+        moves = threats[:] if threats else prune_moves(state)
+        moves.sort(key=lambda index: (-sum(cells[nb] != NoneTeam for nb in neighbors[index]), distance[index]))
+        red_keys, blue_keys, turn_key = state.zobrist
+        keys = red_keys if state.turn == RedTeam else blue_keys
+        return [(move, state.hash ^ keys[move] ^ turn_key) for move in moves]
+
+    def mid(self, state: BoardState, th_phi: int, th_delta: int):
+        """展开局面直到 phi 或 delta 超过阈值, 结果写入置换表"""
+        self.nodes += 1
+        if perf_counter() > self.end_time:
+            raise SolverTimeout()
+        if self.cancelled and self.nodes % self.check_interval == 0 and self.cancelled():
+            raise SolverTimeout()
+        table, key = self.table, state.hash
+        if state.get_winner() != NoneTeam:  # 上一步落子的一方已经获胜, 当前下棋方失败
+            table[key] = (INF, 0)
+            return
+        wins = winning_cells(state)
+        threats = wins[-state.turn]
+        if wins[state.turn] or len(threats) > 1:  # 一步获胜, 或者对手有两处一步获胜的位置无法同时堵住
+            table[key] = (0, INF) if wins[state.turn] else (INF, 0)
+            return
+
+        children = self.children(state, threats)
+        while True:
+            delta = 0
+            best_move, best_phi, best_delta, second_delta = -1, INF, INF, INF
+            for move, child_key in children:
+                child_phi, child_delta = table.get(child_key, (1, 1))
+                delta += child_phi
+                if child_delta < best_delta:
+                    best_move, best_phi, second_delta, best_delta = move, child_phi, best_delta, child_delta
+                elif child_delta < second_delta:
+                    second_delta = child_delta
+            phi, delta = best_delta, min(delta, INF)
+            if phi >= th_phi or delta >= th_delta:
+                table[key] = (phi, delta)
+                if len(table) > self.capacity:
+                    self.trim()
+                return
+            table[key] = (phi, delta)
+            child = state.copy()
+            child.play(best_move)
+            self.mid(child, min(th_delta - delta + best_phi, INF), min(th_phi, second_delta + 1))
+
+    def trim(self):
+        """
+        置换表超过容量时腾出一半空间: 先删除没有解出的局面, 仍然太多时按写入的先后删除最早解出的局面
+        每次至少腾出一半容量, 之后要再写入这么多局面才会再次触发; 原地删除, 递归中的上层调用仍然持有同一个字典
+        """
+        table, target = self.table, self.capacity // 2
+        for key in [key for key, (phi, delta) in table.items() if phi and delta]:
+            del table[key]
+        if len(table) > target:
+            for key in list(islice(table, len(table) - target)):
+                del table[key]
+
+
+def main():
+    parser = ArgumentParser(description="solve an empty hex board with df-pn")
+    parser.add_argument("--size", type=int, required=True, help="棋盘大小")
+    parser.add_argument("--first", choices=["red", "blue"], default="red", help="先手方")
+    parser.add_argument("--time", type=float, default=float('inf'), help="时间上限/秒")
+    parser.add_argument("--board", default="array", choices=["array", "bitboard"], help="棋盘状态的实现")
+    args = parser.parse_args()
+
+    turn = RedTeam if args.first == "red" else BlueTeam
+    state = board_class(args.board)([[NoneTeam] * args.size for _ in range(args.size)], turn)
+    result = Solver().solve(state, args.time)
+    winner = {RedTeam: "red", BlueTeam: "blue", NoneTeam: "unknown"}[result.winner]
+    print(f"[Solver] {args.size}x{args.size} {winner=}, move={result.move}, "
+          f"nodes={result.nodes}, run_time={result.run_time:.2f}")
+
+
+if __name__ == "__main__":
+    main()
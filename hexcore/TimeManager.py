@@ -0,0 +1,51 @@
+"""
+整局的时间管理
+给定一局棋的总思考时间, 根据棋盘上剩余的空白位置估计自己还需要下的步数, 为每一步分配搜索时间,
+并预留一部分时间用于最佳落子不稳定时延长搜索
+"""
+from time import perf_counter, time
+from typing import Tuple
+
+
+class TimeManager:
+    """整局的时间管理器, 每个 AI 一个, 对局结束时重置"""
+
+    def __init__(self, budget: float, min_time: float = 0.05, fill_ratio: float = 0.5, extend_ratio: float = 0.5,
+                 safety: float = 0.05):
+        """
+        :param budget: 一局棋的总思考时间/秒
+        :param min_time: 每一步最少的搜索时间/秒
+        :param fill_ratio: 估计对局结束时棋盘被占满的比例, 用于估计剩余步数
+        :param extend_ratio: 延长搜索的时间最多为分配时间的比例
+        :param safety: 每一步预留的时间/秒, 用于落子和进程间通信等搜索以外的开销
+        """
+        self.budget = budget
+        self.remaining = budget  # 剩余的思考时间
+        self.min_time = min_time
+        self.fill_ratio = fill_ratio
+        self.extend_ratio = extend_ratio
+        self.safety = safety
+        self.move_start = 0  # 本步开始思考的时间
+
+    def reset(self):
+        """新的一局, 恢复全部思考时间"""
+        self.remaining = self.budget
+
+    def allocate(self, empty_cells: int, total_cells: int) -> Tuple[float, float, float]:
+        """
+        为本步分配搜索时间, 同时开始计时
+        剩余步数按双方轮流下满 fill_ratio 的棋盘估计, 且至少为空白位置的 1/8 和 2 步
+        :return: 搜索时间/秒, 最多延长的时间/秒, 绝对的截止时间(与 time.time() 比较)
+        """
+        self.move_start = perf_counter()
+        moves_left = max((empty_cells - total_cells * (1 - self.fill_ratio)) / 2, empty_cells / 8, 2)
+        available = max(self.remaining - self.safety, 0)
+        time_limit = max(min(available / moves_left, available / 2), self.min_time)
+        extend = min(time_limit * self.extend_ratio, max(available - time_limit, 0) / moves_left)
+        return time_limit, extend, time() + max(available, self.min_time)
+
+    def finish(self) -> float:
+        """本步结束, 扣除实际使用的时间, 返回本步用时/秒"""
+        used = perf_counter() - self.move_start
+        self.remaining = max(self.remaining - used, 0)
+        return used